@@ -0,0 +1,333 @@
+"""count_sentence 分类流程的可复现基准测试
+
+离线运行：默认用确定性的哈希向量代替句向量模型，不需要联网下载模型。
+
+    python bench_sentence.py --sentences 400 --output bench.json
+    python bench_sentence.py --output new.json --compare bench.json --tolerance 0.2
+"""
+import argparse
+import hashlib
+import io
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import count_sentence
+from count_sentence import (CLASS_CONFIG, ENCODER_BACKENDS, MODEL_NAME, EncoderBackend, PolicyAnalyzer,
+                            iter_split_sentences, normalize_rows, tokenize)
+
+FILLERS = [
+    "各地要结合实际", "认真贯彻落实", "进一步加大工作力度", "切实推动", "统筹推进",
+    "加快建立健全", "不断完善", "全面提升", "扎实开展", "积极探索",
+]
+RURAL_WORDS = ["农村", "农业", "农民", "乡村", "乡镇"]
+
+
+class StubEncoder:
+    """确定性的句向量替身：字符二元组哈希到固定维度，与真实模型的 encode 接口一致"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        vectors = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for a, b in zip(sentence, sentence[1:] + " "):
+                digest = hashlib.md5((a + b).encode("utf-8")).digest()
+                vectors[row, int.from_bytes(digest[:4], "little") % self.dim] += 1.0
+        return vectors
+
+
+class StubBackend(EncoderBackend):
+    """StubEncoder 的后端包装；key 与真实模型不同，类别原型等缓存不会与真实模型混用"""
+
+    def __init__(self, dim=384, **kwargs):
+        super().__init__(model_name="stub", **kwargs)
+        self.dim = dim
+
+    @property
+    def key(self):
+        return f"stub-{self.dim}"
+
+    def _load(self):
+        return StubEncoder(self.dim)
+
+
+def generate_document(train_contents, n_sentences, keyword_density=0.3, train_overlap=0.3, seed=0):
+    """生成规模与关键词密度可控的合成政策文本
+
+    train_overlap 比例的句子取自训练集（走训练集匹配层），keyword_density 比例的其余句子
+    嵌入 CLASS_CONFIG 关键词（走关键词层），剩下的句子只能由向量层决定。
+    """
+    rng = random.Random(seed)
+    keywords = [term for system in CLASS_CONFIG.values() for terms in system["categories"].values() for term in terms]
+    sentences = []
+    for _ in range(n_sentences):
+        roll = rng.random()
+        if roll < train_overlap:
+            sentence = rng.choice(train_contents).rstrip("。")
+        else:
+            parts = [rng.choice(FILLERS), rng.choice(RURAL_WORDS)]
+            if roll < train_overlap + keyword_density * (1 - train_overlap):
+                parts.append(rng.choice(keywords))
+            parts.extend(rng.sample(FILLERS, 2))
+            sentence = "，".join(parts)
+        sentences.append(sentence + "。")
+    return "".join(sentences)
+
+
+def peak_rss_mb():
+    # Linux 下 ru_maxrss 单位为 KB；该值是进程启动以来的峰值
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(latencies, n_items=None, total=None):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    total = float(latencies.sum()) if total is None else total
+    n_items = len(latencies) if n_items is None else n_items
+    result = {
+        "items": n_items,
+        "total_s": round(total, 6),
+        "items_per_s": round(n_items / total, 2) if total else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if len(latencies):
+        result["p50_ms"] = round(float(np.percentile(latencies, 50)) * 1000, 4)
+        result["p99_ms"] = round(float(np.percentile(latencies, 99)) * 1000, 4)
+    return result
+
+
+def time_each(func, items):
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def time_once(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def check_splitter_equivalence(analyzer, texts, chunk_sizes=(1, 2, 3, 7, 64, 4096), seed=0):
+    """流式切句与 split_sentences 逐句比对：固定块大小读文件对象，另加随机切分的字符串迭代器"""
+    rng = random.Random(seed)
+    mismatches = 0
+    for text in texts:
+        expected = analyzer.split_sentences(text)
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 8)))
+        pieces = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+        candidates = [iter_split_sentences(io.StringIO(text), size) for size in chunk_sizes]
+        candidates.append(iter_split_sentences(iter(pieces)))
+        mismatches += sum(list(sentences) != expected for sentences in candidates)
+    return mismatches
+
+
+def splitter_cases(text, seed=0):
+    # 基准文档本身 + 换行/空白/句末标点密集、结尾短尾巴等边界情况
+    rng = random.Random(seed)
+    alphabet = list("乡农村业发展推进工作。！？，") + [" ", "\n", "\t", "\u3000", " \n "]
+    cases = [text, text.replace("。", "。\n  "), "", "乡村", "。。。", "乡村振兴" * 6 + "。短尾农", "乡" * 25 + "。"]
+    for _ in range(200):
+        cases.append("".join(rng.choice(alphabet) for _ in range(rng.randint(0, 120))))
+    return cases
+
+
+def bench_startup():
+    code = ("import time, sys; t = time.perf_counter(); import count_sentence as c; c.PolicyAnalyzer(); "
+            "print(time.perf_counter() - t); "
+            "print(','.join(m for m in ('torch', 'sentence_transformers', 'sklearn', 'pandas') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=Path(count_sentence.__file__).parent, check=True).stdout.splitlines()
+    heavy = [m for m in (out[1].split(",") if len(out) > 1 else []) if m]
+    return {"total_s": round(float(out[0]), 4), "heavy_modules": heavy}
+
+
+def run(args):
+    import pandas as pd
+
+    train_df = pd.read_csv(args.train_data, sep="\t")
+    contents = train_df["content"].astype(str).tolist()
+    text = generate_document(contents, args.sentences, args.keyword_density, args.train_overlap, args.seed)
+
+    if args.real_model:
+        encoder = args.encoder
+    else:
+        encoder = StubBackend(max_batch_size=args.encoder_batch_size)
+    analyzer = PolicyAnalyzer(model_name=args.model, cache_dir=args.cache_dir, encoder=encoder,
+                              encoder_threads=args.encoder_threads, encoder_batch_size=args.encoder_batch_size)
+    analyzer.train_data = train_df
+    analyzer.warmup()
+    if args.fit:
+        analyzer.fit()
+
+    sentences = analyzer.split_sentences(text)
+    rng = random.Random(args.seed)
+    results = {"startup": bench_startup()}
+
+    elapsed = time_once(lambda: analyzer.split_sentences(text))
+    results["split_sentences"] = summarize([], n_items=len(sentences), total=elapsed)
+    elapsed = time_once(lambda: list(iter_split_sentences(io.StringIO(text))))
+    results["iter_split_sentences"] = summarize([], n_items=len(sentences), total=elapsed)
+    results["iter_split_sentences"]["mismatches"] = check_splitter_equivalence(
+        analyzer, splitter_cases(text, args.seed), seed=args.seed)
+
+    pairs = [(rng.choice(sentences), rng.choice(contents)) for _ in range(args.pairs)]
+    results["calculate_similarity"] = summarize(time_each(lambda p: analyzer.calculate_similarity(*p), pairs))
+
+    # 各层单独计时：训练集匹配、逻辑回归、关键词、向量原型
+    results["tier.train_match"] = summarize(time_each(lambda s: analyzer.train_index.match(tokenize(s)), sentences))
+    elapsed = time_once(lambda: analyzer.match_batch(sentences))
+    results["tier.train_match_batch"] = summarize([], n_items=len(sentences), total=elapsed)
+    if args.fit:
+        results["tier.lr"] = summarize(time_each(lambda s: analyzer._lr_classify(s, "target"), sentences))
+    results["tier.keyword"] = summarize(time_each(lambda s: analyzer.keyword_automaton.match(s), sentences))
+    results["tier.embedding"] = summarize(
+        time_each(lambda s: analyzer._embedding_classify([s], {k: [0] for k in CLASS_CONFIG}), sentences))
+    results["_classify"] = summarize(
+        time_each(lambda s: [analyzer._classify(s, k) for k in CLASS_CONFIG], sentences))
+    results["_semantic_classify"] = summarize(
+        time_each(lambda s: [analyzer._semantic_classify(s, k) for k in CLASS_CONFIG], sentences))
+
+    analyzer.reset_data()
+    elapsed = time_once(lambda: analyzer.analyze(text))
+    results["analyze"] = summarize([], n_items=len(sentences), total=elapsed)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "commit": git_commit(),
+            "encoder": analyzer.encoder.key,
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+
+def encoder_parity(args):
+    """各句向量后端在 train_data.csv 上的一致性与吞吐（需要真实模型）
+
+    以全精度 torch 后端为基准：句向量余弦相似度、向量层分类与基准的一致率、相对人工标注的准确率，
+    以及不走缓存时的编码吞吐。
+    """
+    import pandas as pd
+
+    train_df = pd.read_csv(args.train_data, sep="\t")
+    contents = train_df["content"].astype(str).tolist()
+    ids = list(range(len(contents)))
+    results, reference = {}, None
+    for name in ["torch"] + [b for b in args.parity if b != "torch"]:
+        analyzer = PolicyAnalyzer(model_name=args.model, cache_dir=args.cache_dir, encoder=name,
+                                  encoder_threads=args.encoder_threads, encoder_batch_size=args.encoder_batch_size)
+        analyzer.warmup()
+        analyzer.encoder.encode(contents[:args.encoder_batch_size])  # 预热（含加载与量化）
+        start = time.perf_counter()
+        vectors = normalize_rows(analyzer.encoder.encode(contents))
+        result = summarize([], n_items=len(contents), total=time.perf_counter() - start)
+
+        known = dict(zip(ids, vectors))
+        predicted = analyzer._embedding_classify(contents, {k: ids for k in CLASS_CONFIG}, known)
+        labels = {k: [r["category"] for r in predicted[k]] for k in CLASS_CONFIG}
+        for k in CLASS_CONFIG:
+            result[f"{k}_accuracy"] = round(float(np.mean(np.array(labels[k]) == train_df[f"{k}_cat"].to_numpy())), 4)
+        if reference is None:
+            reference = (vectors, labels)
+        else:
+            cosine = (vectors * reference[0]).sum(axis=1)
+            result["cosine_mean"] = round(float(cosine.mean()), 6)
+            result["cosine_min"] = round(float(cosine.min()), 6)
+            for k in CLASS_CONFIG:
+                result[f"{k}_agreement"] = round(float(np.mean(np.array(labels[k]) == np.array(reference[1][k]))), 4)
+            result["speedup"] = round(result["items_per_s"] / results["encoder.torch"]["items_per_s"], 2)
+        results[f"encoder.{name}"] = result
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "commit": git_commit(),
+            "encoder": args.model,
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline, tolerance):
+    """吞吐量下降超过 tolerance（比例）的项目视为回归，返回回归列表"""
+    regressions = []
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name, {})
+        new_rate, old_rate = result.get("items_per_s"), old.get("items_per_s")
+        if new_rate and old_rate and new_rate < old_rate * (1 - tolerance):
+            regressions.append((name, old_rate, new_rate))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="count_sentence 基准测试")
+    parser.add_argument("--train-data", default=str(Path(__file__).parent / "train_data.csv"))
+    parser.add_argument("--sentences", type=int, default=400, help="合成文档的句子数")
+    parser.add_argument("--keyword-density", type=float, default=0.3)
+    parser.add_argument("--train-overlap", type=float, default=0.3)
+    parser.add_argument("--pairs", type=int, default=200, help="calculate_similarity 计时的句对数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fit", action="store_true", help="同时训练并计时逻辑回归层")
+    parser.add_argument("--real-model", action="store_true", help="使用真实句向量模型（需要联网或本地缓存）")
+    parser.add_argument("--model", default=MODEL_NAME, help="句向量模型名或本地路径")
+    parser.add_argument("--encoder", default="torch", choices=sorted(ENCODER_BACKENDS))
+    parser.add_argument("--encoder-threads", type=int, help="推理线程数")
+    parser.add_argument("--encoder-batch-size", type=int, default=64)
+    parser.add_argument("--parity", nargs="*", choices=sorted(ENCODER_BACKENDS),
+                        help="只比较各句向量后端在训练集上的一致性与吞吐（需要真实模型）")
+    parser.add_argument("--cache-dir", default=str(Path(".bench_cache")))
+    parser.add_argument("--output", help="结果 JSON 路径")
+    parser.add_argument("--compare", help="与之比较的基线 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = encoder_parity(args) if args.parity is not None else run(args)
+    for name, result in report["results"].items():
+        print(f"{name:28s} {json.dumps(result, ensure_ascii=False)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for name, old_rate, new_rate in regressions:
+            print(f"回归: {name} {old_rate} -> {new_rate} items/s")
+        if regressions:
+            sys.exit(1)
+
+    if report["results"].get("iter_split_sentences", {}).get("mismatches"):
+        print("流式切句与 split_sentences 结果不一致")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""用 fixtures/ 中保存的页面离线检查抓取流程
+
+启动本地夹具服务器，以不允许启动浏览器的方式运行 crawl_concurrent，检查条目数、元数据与正文，
+再用同一个断点存储重跑一遍，确认已抓取的政策不会重复抓取；最后让一个详情页失效，确认失败的政策
+不写入断点存储、所在页码不记为已完成，页面恢复后续抓能补齐。发现问题时以非零状态退出。
+
+    python check_crawler.py
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from fixture_server import serve_fixtures
+from scrawlpolices import CheckpointStore, crawl_concurrent
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+LIST_PATH = '/col/col1229697834/index.html?pageNum={}'
+
+
+def no_browser():
+    raise RuntimeError("夹具页面不需要浏览器")
+
+
+def expected_policies(directory):
+    return sum(Path(path).read_text(encoding='utf-8').count('xzgfx_list_item')
+               for path in sorted(Path(directory).glob('list_*.html')))
+
+
+def check_policies(policies, expected):
+    problems = []
+    if len(policies) != expected:
+        problems.append(f"应抓取 {expected} 条政策，实际 {len(policies)} 条")
+    for policy in policies:
+        for field in ('文件名称', '文号', '发布日期', '主题分类', '正文'):
+            if not policy.get(field):
+                problems.append(f"{policy.get('来源')} 缺少 {field}")
+    return problems
+
+
+def run_checks(directory=FIXTURES, workers=2):
+    pages = range(1, len(list(Path(directory).glob('list_*.html'))) + 1)
+    expected = expected_policies(directory)
+    server, base_url = serve_fixtures(directory)
+    problems = []
+    try:
+        template = base_url + LIST_PATH
+        policies, failed_pages = crawl_concurrent(pages, template, workers=workers, min_interval=0,
+                                                  driver_factory=no_browser)
+        if failed_pages:
+            problems.append(f"抓取失败的页码: {failed_pages}")
+        problems.extend(check_policies(policies, expected))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with CheckpointStore(Path(tmp) / 'checkpoint.sqlite') as store:
+                crawl_concurrent(pages, template, workers=workers, min_interval=0,
+                                 driver_factory=no_browser, store=store)
+                problems.extend(check_policies(store.policies(), expected))
+                refetched = []
+                crawl_concurrent(pages, template, workers=workers, min_interval=0, driver_factory=no_browser,
+                                 store=store, on_policy=refetched.append)
+                if refetched:
+                    problems.append(f"断点续抓重复抓取了 {len(refetched)} 条政策")
+    finally:
+        server.shutdown()
+    problems.extend(check_failed_detail(directory, pages, expected, workers))
+    return problems
+
+
+def check_failed_detail(directory, pages, expected, workers):
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        site = Path(tmp) / 'site'
+        shutil.copytree(directory, site)
+        broken = sorted(site.glob('art/**/*.html'))[0]
+        original = broken.read_text(encoding='utf-8')
+        # 去掉 xxgk 信息表后 HTTP 解析失败，只能改用浏览器，而浏览器不可用
+        broken.write_text(original.replace('class="xxgk"', 'class="missing"'), encoding='utf-8')
+
+        server, base_url = serve_fixtures(site)
+        try:
+            template = base_url + LIST_PATH
+            with CheckpointStore(Path(tmp) / 'checkpoint.sqlite') as store:
+                _, failed_pages = crawl_concurrent(pages, template, workers=workers, min_interval=0,
+                                                   max_retries=2, driver_factory=no_browser, store=store)
+                if len(store) != expected - 1:
+                    problems.append(f"详情页失败后断点存储应有 {expected - 1} 条政策，实际 {len(store)} 条")
+                if len(failed_pages) != 1 or failed_pages[0] in store.done_pages():
+                    problems.append(f"详情页失败的页码不应记为已完成: {failed_pages}")
+
+                broken.write_text(original, encoding='utf-8')
+                _, failed_pages = crawl_concurrent(pages, template, workers=workers, min_interval=0,
+                                                   driver_factory=no_browser, store=store)
+                if failed_pages or len(store) != expected or store.first_incomplete_page(len(pages)) is not None:
+                    problems.append("页面恢复后续抓没有补齐失败的政策")
+        finally:
+            server.shutdown()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用本地夹具页面检查抓取流程")
+    parser.add_argument('--fixtures', default=str(FIXTURES))
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    problems = run_checks(args.fixtures, args.workers)
+    for problem in problems:
+        print(f"失败: {problem}")
+    if problems:
+        sys.exit(1)
+    print("抓取检查通过")
+
+
+if __name__ == "__main__":
+    main()
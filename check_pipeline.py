@@ -0,0 +1,130 @@
+"""用 fixtures/ 中保存的页面离线检查抓取—分类流水线
+
+启动本地夹具服务器，不允许启动浏览器、用基准测试的 StubBackend 代替句向量模型运行 run_pipeline：
+检查主进程分析与 2 个分析进程的句子记录一致；用同一个断点存储重跑时不再分析、不追加输出；
+同一政策同时出现在两个列表页时只输出一份句子记录。发现问题时以非零状态退出。
+
+    python check_pipeline.py
+"""
+import argparse
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from bench_sentence import StubBackend
+from check_crawler import FIXTURES, LIST_PATH, expected_policies, no_browser
+from count_sentence import PolicyAnalyzer
+from fixture_server import serve_fixtures
+from pipeline import run_pipeline
+from scrawlpolices import CheckpointStore
+
+TRAIN_DATA = Path(__file__).parent / 'train_data.csv'
+
+
+def make_analyzer(cache_dir):
+    analyzer = PolicyAnalyzer(cache_dir=cache_dir, encoder=StubBackend())
+    analyzer.train_data = pd.read_csv(TRAIN_DATA, sep='\t')
+    return analyzer
+
+
+def normalized_rows(output_file):
+    # 分析顺序取决于抓取完成的先后，doc_id 不参与比较
+    df = pd.read_csv(output_file).drop(columns=['doc_id'])
+    return df.sort_values(['来源', 'sentence_id']).reset_index(drop=True)
+
+
+def compare_rows(name, rows, expected):
+    try:
+        pd.testing.assert_frame_equal(rows, expected, check_exact=False, rtol=1e-5)
+    except AssertionError as e:
+        return [f"{name} 的句子记录与主进程分析结果不一致: {str(e).splitlines()[0]}"]
+    return []
+
+
+def check_rows(name, output_file, expected_count):
+    rows = normalized_rows(output_file)
+    problems = []
+    if rows['来源'].nunique() != expected_count:
+        problems.append(f"{name} 应输出 {expected_count} 条政策的句子，实际 {rows['来源'].nunique()} 条")
+    duplicated = int(rows.duplicated(['来源', 'sentence_id']).sum())
+    if duplicated:
+        problems.append(f"{name} 有 {duplicated} 条重复的句子记录")
+    return rows, problems
+
+
+def add_duplicate_listing(site):
+    # 把第 1 页的最后一条复制到第 2 页末尾，模拟翻页过程中列表发生变动
+    items = re.findall(r'<li class="xzgfx_list_item">.*?</li>', (site / 'list_1.html').read_text(encoding='utf-8'),
+                       re.S)
+    list_2 = site / 'list_2.html'
+    html = list_2.read_text(encoding='utf-8')
+    list_2.write_text(html.replace('</ul>', f'  {items[-1]}\n  </ul>', 1), encoding='utf-8')
+
+
+def run_checks(directory=FIXTURES, workers=2):
+    pages = range(1, len(list(Path(directory).glob('list_*.html'))) + 1)
+    expected = expected_policies(directory)
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache_dir = tmp / 'cache'
+        site = tmp / 'site'
+        shutil.copytree(directory, site)
+
+        server, base_url = serve_fixtures(site)
+        try:
+            template = base_url + LIST_PATH
+            options = dict(min_interval=0, driver_factory=no_browser, batch_size=5)
+
+            run_pipeline(make_analyzer(cache_dir), pages, tmp / 'serial.csv', template, **options)
+            reference, found = check_rows("主进程分析", tmp / 'serial.csv', expected)
+            problems.extend(found)
+
+            run_pipeline(make_analyzer(cache_dir), pages, tmp / 'workers.csv', template,
+                         analyze_workers=workers, **options)
+            rows, found = check_rows(f"{workers} 个分析进程", tmp / 'workers.csv', expected)
+            problems.extend(found + compare_rows(f"{workers} 个分析进程", rows, reference))
+
+            with CheckpointStore(tmp / 'checkpoint.sqlite') as store:
+                run_pipeline(make_analyzer(cache_dir), pages, tmp / 'resume.csv', template, store=store, **options)
+                written = len(pd.read_csv(tmp / 'resume.csv'))
+                summary = run_pipeline(make_analyzer(cache_dir), pages, tmp / 'resume.csv', template,
+                                       store=store, **options)
+                if summary["policies"] or len(pd.read_csv(tmp / 'resume.csv')) != written:
+                    problems.append(f"断点续跑重复分析了 {summary['policies']} 条政策")
+
+            add_duplicate_listing(site)
+            for name, analyze_workers in (("主进程分析", 1), (f"{workers} 个分析进程", workers)):
+                name = f"重复列出政策时{name}"
+                with CheckpointStore(tmp / f'duplicate_{analyze_workers}.sqlite') as store:
+                    for output_file, run_store in ((tmp / f'duplicate_{analyze_workers}.csv', None),
+                                                   (tmp / f'duplicate_store_{analyze_workers}.csv', store)):
+                        run_pipeline(make_analyzer(cache_dir), pages, output_file, template,
+                                     analyze_workers=analyze_workers, store=run_store, **options)
+                        rows, found = check_rows(name, output_file, expected)
+                        problems.extend(found + compare_rows(name, rows, reference))
+        finally:
+            server.shutdown()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用本地夹具页面检查抓取—分类流水线")
+    parser.add_argument('--fixtures', default=str(FIXTURES))
+    parser.add_argument('--workers', type=int, default=2, help="分析进程数")
+    args = parser.parse_args()
+
+    problems = run_checks(args.fixtures, args.workers)
+    for problem in problems:
+        print(f"失败: {problem}")
+    if problems:
+        sys.exit(1)
+    print("流水线检查通过")
+
+
+if __name__ == "__main__":
+    main()
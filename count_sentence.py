@@ -1,13 +1,24 @@
+# sentence_transformers / torch、sklearn、pandas、scipy 均在首次使用时才导入，
+# 保证 import count_sentence 与创建 PolicyAnalyzer 足够轻量（见 README 中的启动时间目标）
 import numpy as np
 import jieba
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from collections import defaultdict, Counter
-from sklearn.linear_model import LogisticRegression
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import LabelEncoder
-import pandas as pd
+from collections import defaultdict, Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+import bisect
+import cProfile
+import csv
+import hashlib
+import json
+import os
+import pstats
 import re
+import sqlite3
+import tempfile
+import time
+import warnings
+import zipfile
 
 # ==================== 语义分类定义 ====================
 CLASS_CONFIG = {
@@ -133,17 +144,1141 @@ CLASS_CONFIG = {
     }
 }
 
+MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+CACHE_DIR = Path(os.environ.get('SENTENCE_CAT_CACHE', Path.home() / '.cache' / 'sentence_cat'))
+
+
+def config_hash(config=CLASS_CONFIG):
+    payload = json.dumps(config, ensure_ascii=False, sort_keys=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def model_key(model_name):
+    return re.sub(r'[^0-9A-Za-z_.-]+', '_', model_name)
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def unique_temp_path(target):
+    """target 同目录下的唯一临时文件（后缀与 target 相同），多个进程同时写同一缓存时互不覆盖"""
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=f"{target.stem}.", suffix=f".tmp{target.suffix}",
+                                     delete=False) as f:
+        return Path(f.name)
+
+
+# ==================== 流式切句 ====================
+SENTENCE_ENDINGS = re.compile(r'([。！？])')
+WHITESPACE = re.compile(r'\s+')
+
+
+def iter_chunks(source, chunk_size=65536):
+    if isinstance(source, str):
+        yield source
+    elif hasattr(source, 'read'):
+        yield from iter(lambda: source.read(chunk_size), '')
+    else:
+        yield from source
+
+
+def iter_split_sentences(source, chunk_size=65536):
+    """与 PolicyAnalyzer.split_sentences 规则完全一致的流式切句
+
+    source 可以是字符串、文件对象（按 chunk_size 读取）或字符串迭代器；跨块的空白与句末标点
+    都能正确处理。短于 20 字的片段并入下一句，结尾不足 10 字的尾巴并入上一句，最后只保留
+    含“乡”或“农”的句子。只缓存当前未结束的句子和上一句，内存占用与文档长度无关。
+    """
+    ends_with_space = False
+    segment = ""    # 最后一个句末标点之后的文本
+    current = ""    # 尚未达到 20 字、等待与后续片段合并的文本
+    previous = None  # 上一句：结尾的短尾巴可能还要并入它，所以延后一句产出
+
+    def keep(sentence):
+        return '乡' in sentence or '农' in sentence
+
+    for chunk in iter_chunks(source, chunk_size):
+        # 等价于对全文做 re.sub(r'\s+', ' ')：跨块的连续空白只保留一个空格。
+        # split_sentences 中第二次 re.sub 需要换行符，而换行在第一步已被替换，因此无需处理
+        chunk = WHITESPACE.sub(' ', chunk)
+        if ends_with_space and chunk.startswith(' '):
+            chunk = chunk[1:]
+        if not chunk:
+            continue
+        ends_with_space = chunk.endswith(' ')
+
+        parts = SENTENCE_ENDINGS.split(chunk)
+        segment += parts[0]
+        for i in range(1, len(parts), 2):
+            current += segment + parts[i]
+            segment = parts[i + 1]
+            if len(current.strip()) >= 20:
+                if previous is not None and keep(previous):
+                    yield previous
+                previous = current.strip()
+                current = ""
+
+    tail = (current + segment).strip()
+    if len(tail) >= 10:
+        if previous is not None and keep(previous):
+            yield previous
+        previous = tail
+    elif previous is not None and tail:
+        previous = previous + tail
+    if previous is not None and keep(previous):
+        yield previous
+
+
+# ==================== 关键词自动机 ====================
+class KeywordAutomaton:
+    """由 CLASS_CONFIG 全部关键词构建的 Aho–Corasick 自动机，一次扫描得到三个体系的命中
+
+    只含普通 list/dict，可直接 pickle 给子进程复用。
+    """
+
+    def __init__(self, config=CLASS_CONFIG):
+        self.categories = {k: list(v["categories"].keys()) for k, v in config.items()}
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+
+        for system_name, system in config.items():
+            for cat_idx, terms in enumerate(system["categories"].values()):
+                for term in terms:
+                    node = 0
+                    for char in term.lower():
+                        nxt = self.goto[node].get(char)
+                        if nxt is None:
+                            nxt = len(self.goto)
+                            self.goto[node][char] = nxt
+                            self.goto.append({})
+                            self.fail.append(0)
+                            self.outputs.append([])
+                        node = nxt
+                    if (system_name, cat_idx) not in self.outputs[node]:
+                        self.outputs[node].append((system_name, cat_idx))
+
+        # 广度优先建立失败指针，并把后缀模式的输出合并到当前结点
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for char, nxt in self.goto[node].items():
+                queue.append(nxt)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.outputs[nxt] = self.outputs[nxt] + self.outputs[self.fail[nxt]]
+
+    def iter_hits(self, sentence):
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        node = 0
+        for char in sentence.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                yield from outputs[node]
+
+    def match(self, sentence):
+        """返回 {体系: 类别或 None}，同一体系内按 CLASS_CONFIG 中类别的先后取第一个命中的类别"""
+        best = {}
+        for system_name, cat_idx in self.iter_hits(sentence):
+            if cat_idx < best.get(system_name, len(self.categories[system_name])):
+                best[system_name] = cat_idx
+        return {
+            system_name: categories[best[system_name]] if system_name in best else None
+            for system_name, categories in self.categories.items()
+        }
+
+    def count_hits(self, sentence):
+        """返回 {体系: Counter({类别: 命中次数})}"""
+        counts = {system_name: Counter() for system_name in self.categories}
+        for system_name, cat_idx in self.iter_hits(sentence):
+            counts[system_name][self.categories[system_name][cat_idx]] += 1
+        return counts
+
+
+# ==================== TF-IDF + 逻辑回归 ====================
+class LinearTier:
+    """训练好的 TF-IDF + LogisticRegression 分类层，预测只依赖 numpy/scipy 数组
+
+    词表（按字典序排列，与 TfidfVectorizer 的特征下标一致）、idf 与系数矩阵都可以
+    以只读 memmap 的方式加载，多个工作进程共享同一份物理内存。
+    """
+
+    ARRAYS = ("terms", "idf", "coef", "intercept")
+
+    def __init__(self, terms, idf, coef, intercept, classes, ngram_range=(1, 2), source=None):
+        self.terms = terms
+        self.idf = idf
+        self.coef = coef
+        self.intercept = intercept
+        self.classes = list(classes)
+        self.analyzer = JiebaAnalyzer(tuple(ngram_range))
+        self.source = source
+
+    @classmethod
+    def from_sklearn(cls, vectorizer, classifier, label_encoder):
+        return cls(
+            terms=np.array(vectorizer.get_feature_names_out().tolist(), dtype=str),
+            idf=np.asarray(vectorizer.idf_, dtype=np.float64),
+            coef=np.asarray(classifier.coef_, dtype=np.float64),
+            intercept=np.asarray(classifier.intercept_, dtype=np.float64),
+            classes=label_encoder.classes_.tolist(),
+            ngram_range=vectorizer.analyzer.ngram_range,
+        )
+
+    def save(self, path, system_name):
+        path = Path(path)
+        for name in self.ARRAYS:
+            np.save(path / f"{system_name}_{name}.npy", np.asarray(getattr(self, name)))
+        return {"classes": self.classes, "ngram_range": list(self.analyzer.ngram_range)}
+
+    @classmethod
+    def load(cls, path, system_name, meta, mmap_mode='r'):
+        path = Path(path)
+        arrays = {name: np.load(path / f"{system_name}_{name}.npy", mmap_mode=mmap_mode) for name in cls.ARRAYS}
+        return cls(classes=meta["classes"], ngram_range=meta["ngram_range"],
+                   source=(str(path), system_name, meta, mmap_mode), **arrays)
+
+    def __getstate__(self):
+        # 从磁盘加载的分类层只传路径，子进程重新 memmap 而不是复制数组
+        if self.source is not None:
+            return {"source": self.source}
+        return self.__dict__
+
+    def __setstate__(self, state):
+        if "source" in state and len(state) == 1:
+            state = LinearTier.load(*state["source"]).__dict__
+        self.__dict__.update(state)
+
+    def transform(self, sentences):
+        from scipy import sparse
+
+        feature_lists = [Counter(self.analyzer(sentence)) for sentence in sentences]
+        vocab = np.array(sorted({f for counts in feature_lists for f in counts}), dtype=str)
+        if len(vocab) and len(self.terms):
+            positions = np.searchsorted(self.terms, vocab).clip(max=len(self.terms) - 1)
+            found = self.terms[positions] == vocab
+        else:
+            positions = found = np.zeros(len(vocab), dtype=bool)
+        term_ids = {f: int(p) for f, p, ok in zip(vocab.tolist(), positions, found) if ok}
+
+        indptr, indices, data = [0], [], []
+        for counts in feature_lists:
+            for feature, count in counts.items():
+                term_id = term_ids.get(feature)
+                if term_id is not None:
+                    indices.append(term_id)
+                    data.append(count * self.idf[term_id])
+            indptr.append(len(indices))
+        X = sparse.csr_matrix((np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), indptr),
+                              shape=(len(sentences), len(self.terms)))
+        # 与 TfidfVectorizer 相同的 l2 归一化
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ X
+
+    def predict_proba(self, sentences):
+        scores = np.asarray(self.transform(sentences) @ self.coef.T) + self.intercept
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, sentences):
+        proba = self.predict_proba(sentences)
+        best = proba.argmax(axis=1)
+        return [{"category": self.classes[j], "confidence": float(proba[n, j])} for n, j in enumerate(best)]
+
+
+# ==================== 训练集句向量 kNN ====================
+class EmbeddingIndex:
+    """训练集句向量索引：向量以 memmap 的 .npy 存储，按分块矩阵乘取 top-k 余弦近邻
+
+    manifest 记录模型名、向量类型、逐行内容哈希与整体 CSV 哈希；训练集只在末尾追加行时
+    只对新增行编码。
+    """
+
+    def __init__(self, vectors, labels, source=None, block_size=4096):
+        self.vectors = vectors
+        self.labels = labels
+        self.source = source
+        self.block_size = block_size
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @staticmethod
+    def paths(cache_dir, model_name):
+        stem = Path(cache_dir) / f"knn_{model_key(model_name)}"
+        return stem.with_suffix('.npy'), stem.with_suffix('.json'), Path(f"{stem}_rows.npy")
+
+    @classmethod
+    def load_or_build(cls, encode, contents, labels, model_name, cache_dir, dtype='float32', batch_size=256):
+        vectors_path, manifest_path, rows_path = cls.paths(cache_dir, model_name)
+        row_hashes = np.array([hashlib.sha1(str(c).encode('utf-8')).hexdigest()[:16] for c in contents], dtype='U16')
+        csv_hash = hashlib.sha1(''.join(row_hashes.tolist()).encode('ascii')).hexdigest()
+
+        manifest = None
+        if manifest_path.exists() and vectors_path.exists() and rows_path.exists():
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("model_name") != model_name or manifest.get("dtype") != dtype:
+                manifest = None
+
+        if manifest is not None and manifest["csv_hash"] == csv_hash:
+            return cls.load(cache_dir, model_name, labels)
+
+        old_count = 0
+        if manifest is not None:
+            old_hashes = np.load(rows_path)
+            if len(old_hashes) <= len(row_hashes) and np.array_equal(old_hashes, row_hashes[:len(old_hashes)]):
+                old_count = len(old_hashes)
+
+        # 只对新增的行编码；其余行直接从旧的向量文件复制
+        new_vectors = [normalize_rows(encode([str(c) for c in contents[start:start + batch_size]]))
+                       for start in range(old_count, len(contents), batch_size)]
+        if new_vectors:
+            dim = new_vectors[0].shape[1]
+        else:
+            dim = np.load(vectors_path, mmap_mode='r').shape[1]
+
+        # 写到各自的临时文件再原子替换：多个进程同时重建时不会互相覆盖半成品
+        tmp_path = unique_temp_path(vectors_path)
+        try:
+            store = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(len(contents), dim))
+            if old_count:
+                old = np.load(vectors_path, mmap_mode='r')
+                for start in range(0, old_count, 65536):
+                    store[start:min(start + 65536, old_count)] = old[start:min(start + 65536, old_count)]
+                del old
+            offset = old_count
+            for block in new_vectors:
+                store[offset:offset + len(block)] = block
+                offset += len(block)
+            store.flush()
+            del store
+            os.replace(tmp_path, vectors_path)
+
+            tmp_path = unique_temp_path(rows_path)
+            np.save(tmp_path, row_hashes)
+            os.replace(tmp_path, rows_path)
+
+            tmp_path = unique_temp_path(manifest_path)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"model_name": model_name, "dtype": dtype, "csv_hash": csv_hash,
+                           "rows": len(contents), "dim": dim}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, manifest_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return cls.load(cache_dir, model_name, labels)
+
+    @classmethod
+    def load(cls, cache_dir, model_name, labels):
+        vectors_path, _, _ = cls.paths(cache_dir, model_name)
+        vectors = np.load(vectors_path, mmap_mode='r')
+        return cls(vectors, labels, source=(str(cache_dir), model_name))
+
+    def __getstate__(self):
+        # 子进程重新 memmap 向量文件，不复制数组
+        state = dict(self.__dict__)
+        if self.source is not None:
+            state["vectors"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.vectors is None:
+            self.vectors = np.load(self.paths(*self.source)[0], mmap_mode='r')
+
+    def search(self, queries, k=5, query_block=1024):
+        """返回 (相似度, 行号)，形状均为 (查询数, k)，按相似度从高到低排列"""
+        queries = normalize_rows(queries)
+        k = min(k, len(self.vectors))
+        top_sims = np.empty((len(queries), k), dtype=np.float32)
+        top_ids = np.empty((len(queries), k), dtype=np.int64)
+
+        for q_start in range(0, len(queries), query_block):
+            q = queries[q_start:q_start + query_block]
+            best_sims = np.full((len(q), 0), -np.inf, dtype=np.float32)
+            best_ids = np.empty((len(q), 0), dtype=np.int64)
+            for start in range(0, len(self.vectors), self.block_size):
+                block = np.asarray(self.vectors[start:start + self.block_size], dtype=np.float32)
+                sims = np.concatenate([best_sims, q @ block.T], axis=1)
+                ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, start + len(block)), (len(q), len(block)))], axis=1)
+                part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+                best_sims = np.take_along_axis(sims, part, axis=1)
+                best_ids = np.take_along_axis(ids, part, axis=1)
+            order = np.argsort(-best_sims, axis=1, kind='stable')
+            top_sims[q_start:q_start + len(q)] = np.take_along_axis(best_sims, order, axis=1)
+            top_ids[q_start:q_start + len(q)] = np.take_along_axis(best_ids, order, axis=1)
+        return top_sims, top_ids
+
+    def vote(self, queries, k=5):
+        """近邻按相似度加权投票，一次得到所有体系的类别；返回 [(最高相似度, {体系: 结果}), ...]"""
+        top_sims, top_ids = self.search(queries, k)
+        outputs = []
+        for sims, ids in zip(top_sims, top_ids):
+            weights = np.clip(sims, 0.0, None).tolist()
+            total = sum(weights) or 1.0
+            by_system = {}
+            for system_name, labels in self.labels.items():
+                votes = defaultdict(float)
+                for row_idx, weight in zip(ids, weights):
+                    votes[labels[row_idx]] += weight
+                category = max(votes, key=votes.get)
+                by_system[system_name] = {"category": category, "confidence": votes[category] / total}
+            outputs.append((float(sims[0]), by_system))
+        return outputs
+
+
+# ==================== 词频统计 ====================
+class WordFreqStore:
+    """共享词表（词语 -> 整数 id）+ numpy 计数数组的词频表
+
+    总计数只保存一份（不再按体系重复三份）；开启 by_category 时另按句子所属的各体系类别分别计数。
+    两个词频表可以直接 merge，便于合并并行运行的结果。
+    """
+
+    def __init__(self, by_category=False, capacity=1024):
+        self.by_category = by_category
+        self.vocab = {}
+        self.words = []
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.category_counts = {}
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.vocab
+
+    def get(self, word, system_name=None, category=None):
+        word_id = self.vocab.get(word)
+        if word_id is None:
+            return 0
+        return int(self._counts_for(system_name, category)[word_id])
+
+    def _ids(self, words):
+        ids = []
+        for word in words:
+            word_id = self.vocab.get(word)
+            if word_id is None:
+                word_id = len(self.words)
+                self.vocab[word] = word_id
+                self.words.append(word)
+            ids.append(word_id)
+        if len(self.words) > len(self.counts):
+            self._grow(len(self.words))
+        return np.asarray(ids, dtype=np.int64)
+
+    def _grow(self, size):
+        capacity = max(size, 2 * len(self.counts))
+        grown = np.zeros(capacity, dtype=np.int64)
+        grown[:len(self.counts)] = self.counts
+        self.counts = grown
+        for categories in self.category_counts.values():
+            for category, counts in categories.items():
+                grown = np.zeros(capacity, dtype=np.int64)
+                grown[:len(counts)] = counts
+                categories[category] = grown
+
+    def _category_array(self, system_name, category):
+        categories = self.category_counts.setdefault(system_name, {})
+        if category not in categories:
+            categories[category] = np.zeros(len(self.counts), dtype=np.int64)
+        return categories[category]
+
+    def _counts_for(self, system_name=None, category=None):
+        if system_name is None:
+            return self.counts
+        return self.category_counts.get(system_name, {}).get(category, np.zeros(len(self.counts), dtype=np.int64))
+
+    def add(self, words, categories=None):
+        """累加一个句子的词语；categories 为 {体系: 类别}，仅在 by_category 时使用"""
+        ids = self._ids(words)
+        np.add.at(self.counts, ids, 1)
+        if self.by_category and categories:
+            for system_name, category in categories.items():
+                np.add.at(self._category_array(system_name, category), ids, 1)
+
+    def merge(self, other):
+        ids = self._ids(other.words)
+        n = len(other.words)
+        self.counts[ids] += other.counts[:n]
+        if self.by_category:
+            for system_name, categories in other.category_counts.items():
+                for category, counts in categories.items():
+                    self._category_array(system_name, category)[ids] += counts[:n]
+        return self
+
+    def top_k(self, k=20, system_name=None, category=None):
+        counts = self._counts_for(system_name, category)[:len(self.words)]
+        k = min(k, len(counts))
+        if k <= 0:
+            return []
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.lexsort((top, -counts[top]))]
+        return [(self.words[i], int(counts[i])) for i in top if counts[i] > 0]
+
+    def to_dict(self, system_name=None, category=None):
+        counts = self._counts_for(system_name, category)
+        return {word: int(counts[i]) for i, word in enumerate(self.words) if counts[i]}
+
+    def save(self, path):
+        n = len(self.words)
+        arrays = {"words": np.array(self.words, dtype=str), "counts": self.counts[:n]}
+        for system_name, categories in self.category_counts.items():
+            for category, counts in categories.items():
+                arrays[f"cat::{system_name}::{category}"] = counts[:n]
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            keys = [key for key in data.files if key.startswith("cat::")]
+            store = cls(by_category=bool(keys), capacity=max(len(data["words"]), 1))
+            store._ids(data["words"].tolist())
+            store.counts[:len(store.words)] = data["counts"]
+            for key in keys:
+                _, system_name, category = key.split("::", 2)
+                store._category_array(system_name, category)[:len(store.words)] = data[key]
+        return store
+
+
+# ==================== 分层统计 ====================
+class TierStats:
+    """各分类层的调用次数、命中率与耗时统计；关闭时 start() 返回 None，record() 直接返回"""
+
+    TIERS = ("cache", "train_match", "knn", "lr", "keyword", "embedding")
+    BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.tiers = {
+            tier: {"calls": 0, "hits": 0, "time_s": 0.0, "histogram": [0] * (len(self.BUCKETS_MS) + 1)}
+            for tier in self.TIERS
+        }
+        self.errors = Counter()
+        self.documents = 0
+        self.sentences = 0
+
+    def start(self):
+        return time.perf_counter() if self.enabled else None
+
+    def record(self, tier, start, calls, hits):
+        # calls / hits 以 (句子, 体系) 为单位计数；耗时按批记录
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        entry = self.tiers[tier]
+        entry["calls"] += calls
+        entry["hits"] += hits
+        entry["time_s"] += elapsed
+        entry["histogram"][bisect.bisect_left(self.BUCKETS_MS, elapsed * 1000)] += 1
+
+    def record_document(self, n_sentences):
+        if self.enabled:
+            self.documents += 1
+            self.sentences += n_sentences
+
+    def merge(self, other):
+        for tier, entry in other["tiers"].items():
+            mine = self.tiers[tier]
+            for key in ("calls", "hits", "time_s"):
+                mine[key] += entry[key]
+            mine["histogram"] = [a + b for a, b in zip(mine["histogram"], entry["histogram"])]
+        self.errors.update(other["errors"])
+        self.documents += other["documents"]
+        self.sentences += other["sentences"]
+
+    def snapshot(self):
+        tiers = {}
+        for tier, entry in self.tiers.items():
+            tiers[tier] = dict(entry, histogram=list(entry["histogram"]),
+                               hit_rate=entry["hits"] / entry["calls"] if entry["calls"] else None)
+        return {
+            "enabled": self.enabled,
+            "documents": self.documents,
+            "sentences": self.sentences,
+            "tiers": tiers,
+            "errors": dict(self.errors),
+            "histogram_buckets_ms": list(self.BUCKETS_MS),
+        }
+
+
+# ==================== 分类结果缓存 ====================
+def normalize_sentence(sentence):
+    return re.sub(r'\s+', ' ', sentence).strip()
+
+
+class SqliteCache:
+    """按键批量读写的 SQLite 缓存基类，子类只需给出表名、值的列类型与编解码
+
+    设置 max_entries 时命中会刷新最近使用时间，条目数超过上限时按最近使用时间淘汰。
+    """
+    TABLE = None
+    VALUE_TYPE = 'TEXT'
+    LAST_USED_INDEX = None
+
+    def __init__(self, path, max_entries=None, chunk_size=500):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} "
+            f"(key TEXT PRIMARY KEY, value {self.VALUE_TYPE} NOT NULL, last_used REAL)"
+        )
+        index = self.LAST_USED_INDEX or f"idx_{self.TABLE}_last_used"
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {self.TABLE} (last_used)")
+        self._conn.commit()
+
+    def __getstate__(self):
+        # 子进程各自打开连接
+        return {"path": self.path, "max_entries": self.max_entries, "chunk_size": self.chunk_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def close(self):
+        self._conn.close()
+
+    def encode_value(self, value):
+        raise NotImplementedError
+
+    def decode_value(self, raw):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """批量查询，返回 {键: 值}"""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), self.chunk_size):
+            chunk = unique[start:start + self.chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, value FROM {self.TABLE} WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update((key, self.decode_value(value)) for key, value in rows)
+        if found and self.max_entries is not None:
+            now = time.time()
+            self._conn.executemany(f"UPDATE {self.TABLE} SET last_used = ? WHERE key = ?",
+                                   [(now, key) for key in found])
+            self._conn.commit()
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items):
+        if not items:
+            return
+        now = time.time()
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO {self.TABLE} (key, value, last_used) VALUES (?, ?, ?)",
+            [(key, self.encode_value(value), now) for key, value in items.items()],
+        )
+        self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        if self.max_entries is None:
+            return
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.TABLE} WHERE key IN "
+                f"(SELECT key FROM {self.TABLE} ORDER BY last_used LIMIT ?)", (excess,)
+            )
+
+    def __len__(self):
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else None,
+                "entries": len(self)}
+
+
+class ClassificationCache(SqliteCache):
+    """按内容寻址的跨运行分类结果缓存（SQLite，值为 JSON）
+
+    键 = sha1(指纹 + 归一化句子)，指纹由 CLASS_CONFIG、训练集、模型与分类层参数决定，
+    任何一项变化都会自然失效。条目数超过 max_entries 时按最近使用时间淘汰。
+    """
+    TABLE = 'classifications'
+    LAST_USED_INDEX = 'idx_last_used'
+
+    def __init__(self, path, max_entries=1000000, chunk_size=500):
+        super().__init__(path, max_entries, chunk_size)
+
+    @staticmethod
+    def make_key(fingerprint, sentence):
+        return hashlib.sha1(f"{fingerprint}\0{normalize_sentence(sentence)}".encode('utf-8')).hexdigest()
+
+    def encode_value(self, value):
+        return json.dumps(value, ensure_ascii=False)
+
+    def decode_value(self, raw):
+        return json.loads(raw)
+
+
+# ==================== 句向量后端 ====================
+class EmbeddingCache(SqliteCache):
+    """按句子哈希缓存句向量（SQLite，值为 float32 原始字节）
+
+    键 = sha1(后端标识 + 句子)，换模型或量化方式后旧条目自然失效。默认不设条目上限。
+    """
+    TABLE = 'embedding_vectors'
+    VALUE_TYPE = 'BLOB'
+
+    @staticmethod
+    def make_key(backend_key, sentence):
+        return hashlib.sha1(f"{backend_key}\0{sentence}".encode('utf-8')).hexdigest()
+
+    def encode_value(self, value):
+        return np.ascontiguousarray(value, dtype=np.float32).tobytes()
+
+    def decode_value(self, raw):
+        return np.frombuffer(raw, dtype=np.float32)
+
+
+class EncoderBackend:
+    """句向量后端基类：子类实现 _load()，返回带 encode(sentences, batch_size=...) 的模型
+
+    替换模型请实现新的子类并给出不同的 key，以免类别原型、kNN 索引等缓存与其它模型混用。
+
+    num_threads 限制推理线程数（torch.set_num_threads，进程级）；单次前向最多 max_batch_size 句；
+    设置 cache 时先查磁盘缓存，只对未命中的句子推理。key 区分模型与推理方式，用于各级缓存。
+    """
+    variant = None
+
+    def __init__(self, model_name=MODEL_NAME, num_threads=None, max_batch_size=64, cache=None):
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self._model = None
+
+    def __getstate__(self):
+        # 多进程分析时后端随初始化参数传给子进程；模型不传，由子进程按需加载
+        state = dict(self.__dict__)
+        state["_model"] = None
+        return state
+
+    @property
+    def key(self):
+        return self.model_name
+
+    @property
+    def model(self):
+        if self._model is None:
+            if self.num_threads:
+                import torch
+
+                torch.set_num_threads(self.num_threads)
+            self._model = self._load()
+        return self._model
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _encode(self, sentences, batch_size):
+        vectors = self.model.encode(list(sentences), batch_size=batch_size, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def encode(self, sentences, batch_size=None, **kwargs):
+        batch_size = min(batch_size or self.max_batch_size, self.max_batch_size)
+        if self.cache is None:
+            return self._encode(sentences, batch_size)
+
+        keys = [EmbeddingCache.make_key(self.key, sentence) for sentence in sentences]
+        cached = self.cache.get_many(keys)
+        missing = list(dict.fromkeys(sentence for sentence, key in zip(sentences, keys) if key not in cached))
+        if missing:
+            computed = dict(zip((EmbeddingCache.make_key(self.key, s) for s in missing),
+                                self._encode(missing, batch_size)))
+            self.cache.put_many(computed)
+            cached.update(computed)
+        return np.stack([cached[key] for key in keys])
+
+
+class TorchBackend(EncoderBackend):
+    """默认后端：sentence-transformers 全精度 PyTorch 推理"""
+    variant = 'torch'
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(self.model_name)
+
+
+class QuantizedBackend(TorchBackend):
+    """CPU 后端：对 Linear 层做 int8 动态量化（权重 int8，激活按批动态量化），不需要额外依赖"""
+    variant = 'int8'
+
+    @property
+    def key(self):
+        return f"{self.model_name}@int8"
+
+    def _load(self):
+        import torch
+
+        model = super()._load().to('cpu')
+        # torch.ao.quantization 已弃用，官方迁移方向是 torchao 的 quantize_；但 torchao 量化后的权重是张量子类，
+        # SentenceTransformer.encode 内部的 .to(device) 无法替换它们而报错，因此暂用 torch.ao 并有意屏蔽弃用警告。
+        # 待 sentence-transformers 兼容 torchao 后改为 quantize_(model, Int8DynamicActivationInt8WeightConfig())
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message=r'torch\.ao\.quantization is deprecated', category=DeprecationWarning)
+            warnings.filterwarnings('ignore', message=r'torch\.quantize_per_tensor', category=UserWarning)
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+ENCODER_BACKENDS = {'torch': TorchBackend, 'int8': QuantizedBackend}
+
+
+def make_encoder(encoder='torch', model_name=MODEL_NAME, num_threads=None, max_batch_size=64, cache_path=None):
+    if isinstance(encoder, EncoderBackend):
+        return encoder
+    if encoder not in ENCODER_BACKENDS:
+        raise ValueError(f"未知的句向量后端: {encoder}（可选 {', '.join(ENCODER_BACKENDS)}）")
+    cache = EmbeddingCache(cache_path) if cache_path else None
+    return ENCODER_BACKENDS[encoder](model_name, num_threads=num_threads, max_batch_size=max_batch_size, cache=cache)
+
+
+def iter_documents(docs):
+    if isinstance(docs, dict):
+        yield from docs.items()
+        return
+    for idx, doc in enumerate(docs):
+        if isinstance(doc, (tuple, list)) and len(doc) == 2:
+            yield doc[0], doc[1]
+        else:
+            yield idx, doc
+
+
+# ==================== 训练集相似度索引 ====================
+SIM_EARLY_EXIT = 0.85
+SIM_THRESHOLD = 0.8
+
+
+# ==================== 分词缓存 ====================
+class TokenCache:
+    """按文本缓存 jieba 分词结果的有界 LRU，同一句子只切分一次"""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, text):
+        tokens = self._cache.get(text)
+        if tokens is not None:
+            self._cache.move_to_end(text)
+            self.hits += 1
+            return tokens
+
+        self.misses += 1
+        tokens = tuple(jieba.lcut(text))
+        self._cache[text] = tokens
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return tokens
+
+    def batch(self, texts):
+        """整篇文档的句子一次调用完成分词，重复句子只切分一次"""
+        segmented = {}
+        for text in texts:
+            if text not in segmented:
+                segmented[text] = self.get(text)
+        return [segmented[text] for text in texts]
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = 0
+
+
+TOKEN_CACHE = TokenCache()
+
+
+def tokenize(text):
+    # 相似度计算使用的词语：去掉空白词
+    return [w for w in TOKEN_CACHE.get(text) if len(w.strip()) > 0]
+
+
+def frequency_words(tokens):
+    # 词频统计使用的词语：长度大于 1 且不是纯数字
+    return [w for w in tokens if len(w) > 1 and not w.isdigit()]
+
+
+class JiebaAnalyzer:
+    """供 TfidfVectorizer 使用的 jieba 分词器，与其它环节共用 TOKEN_CACHE"""
+
+    def __init__(self, ngram_range=(1, 2)):
+        self.ngram_range = ngram_range
+
+    def __call__(self, text):
+        words = [w.lower() for w in tokenize(text)]
+        min_n, max_n = self.ngram_range
+        features = []
+        for n in range(min_n, max_n + 1):
+            features.extend(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return features
+
+
+def blend_similarity(shared, size1, size2, dot, norm1, norm2):
+    # 0.6 * Jaccard + 0.4 * 词频余弦，与 calculate_similarity 的计算顺序保持一致
+    union = size1 + size2 - shared
+    jaccard = shared / union if union else 0.0
+    cosine = dot / (norm1 * norm2) if norm1 and norm2 else 0.0
+    return 0.6 * jaccard + 0.4 * cosine
+
+
+class TrainIndex:
+    """训练集倒排索引：每行只分词一次，按共享词语筛选候选行"""
+
+    def __init__(self, contents):
+        self.token_sets = []
+        self.term_counts = []
+        self.norms = []
+        self.postings = defaultdict(list)
+        self.vocab = {}
+        self._matrices = None
+
+        for row_idx, content in enumerate(contents):
+            counts = Counter(tokenize(str(content)))
+            self.token_sets.append(frozenset(counts))
+            self.term_counts.append(counts)
+            self.norms.append(sum(c * c for c in counts.values()) ** 0.5)
+            for word in counts:
+                self.postings[word].append(row_idx)
+                self.vocab.setdefault(word, len(self.vocab))
+
+    def __len__(self):
+        return len(self.term_counts)
+
+    def match(self, tokens):
+        """返回 (行号, 相似度)，规则与逐行扫描一致：先取首个 >= 0.85 的行，否则取最大值"""
+        if not tokens:
+            return None, 0.0
+
+        counts = Counter(tokens)
+        size = len(counts)
+        norm = sum(c * c for c in counts.values()) ** 0.5
+
+        shared = Counter()
+        for word in counts:
+            for row_idx in self.postings.get(word, ()):
+                shared[row_idx] += 1
+
+        # 低于 SIM_THRESHOLD 的行会被剪枝，此时返回的分数不代表真实最大值
+        best_row, best_score = None, 0.0
+        for row_idx in sorted(shared):
+            n_shared = shared[row_idx]
+            row_size = len(self.token_sets[row_idx])
+            # 余弦项最大为 1，Jaccard 不足时整体不可能达到阈值
+            if 0.6 * n_shared / (size + row_size - n_shared) + 0.4 + 1e-9 < SIM_THRESHOLD:
+                continue
+            row_counts = self.term_counts[row_idx]
+            dot = sum(c * row_counts[w] for w, c in counts.items() if w in row_counts)
+            score = blend_similarity(n_shared, size, row_size, dot, norm, self.norms[row_idx])
+            if score > best_score:
+                best_row, best_score = row_idx, score
+                if score >= SIM_EARLY_EXIT:
+                    break
+
+        return best_row, best_score
+
+    def _count_matrix(self, counters):
+        from scipy import sparse
+
+        # 按共享词表构造稀疏词频矩阵，词表外的词语不参与交集与点积
+        indptr, indices, data = [0], [], []
+        for counts in counters:
+            for word, count in counts.items():
+                word_id = self.vocab.get(word)
+                if word_id is not None:
+                    indices.append(word_id)
+                    data.append(count)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), indptr),
+            shape=(len(counters), len(self.vocab)),
+        )
+
+    def _train_matrices(self):
+        if self._matrices is None:
+            counts = self._count_matrix(self.term_counts)
+            binary = counts.copy()
+            binary.data[:] = 1.0
+            self._matrices = {
+                "counts_t": counts.T.tocsr(),
+                "binary_t": binary.T.tocsr(),
+                "sizes": np.array([len(t) for t in self.token_sets], dtype=np.float64),
+                "norms": np.array(self.norms, dtype=np.float64),
+            }
+        return self._matrices
+
+    def match_batch(self, token_lists, block_size=1024):
+        """批量匹配：返回每个句子的最佳行号数组（无匹配为 -1）与相似度数组，选行规则同 match"""
+        n = len(token_lists)
+        best_rows = np.full(n, -1, dtype=np.int64)
+        best_scores = np.zeros(n, dtype=np.float64)
+        if n == 0 or not self.vocab:
+            return best_rows, best_scores
+
+        train = self._train_matrices()
+        for start in range(0, n, block_size):
+            counters = [Counter(tokens) for tokens in token_lists[start:start + block_size]]
+            sizes = np.array([len(c) for c in counters], dtype=np.float64)
+            norms = np.array([sum(v * v for v in c.values()) ** 0.5 for c in counters], dtype=np.float64)
+
+            counts = self._count_matrix(counters)
+            binary = counts.copy()
+            binary.data[:] = 1.0
+
+            # 交集大小与点积的非零结构相同：都只在存在共享词语的 (句子, 行) 上出现
+            shared = (binary @ train["binary_t"]).tocsr()
+            dots = (counts @ train["counts_t"]).tocsr()
+            shared.sort_indices()
+            dots.sort_indices()
+
+            rows = np.repeat(np.arange(shared.shape[0]), np.diff(shared.indptr))
+            cols = shared.indices
+            union = sizes[rows] + train["sizes"][cols] - shared.data
+            jaccard = shared.data / union
+            cosine = dots.data / (norms[rows] * train["norms"][cols])
+            scores = 0.6 * jaccard + 0.4 * cosine
+            if not len(scores):
+                continue
+
+            # 默认取最大值（并列时取靠前的行）
+            order = np.lexsort((cols, -scores, rows))
+            first = np.unique(rows[order], return_index=True)[1]
+            picked = order[first]
+            best_rows[start + rows[picked]] = cols[picked]
+            best_scores[start + rows[picked]] = scores[picked]
+
+            # 与逐行扫描一致：存在 >= 0.85 的行时取其中最靠前的一行
+            early = np.flatnonzero(scores >= SIM_EARLY_EXIT)
+            if len(early):
+                order = early[np.lexsort((cols[early], rows[early]))]
+                first = np.unique(rows[order], return_index=True)[1]
+                picked = order[first]
+                best_rows[start + rows[picked]] = cols[picked]
+                best_scores[start + rows[picked]] = scores[picked]
+
+        return best_rows, best_scores
+
+
 class PolicyAnalyzer:
-    def __init__(self):
-        self.model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+    def __init__(self, model_name=MODEL_NAME, cache_dir=CACHE_DIR,
+                 use_knn=False, knn_k=5, knn_min_similarity=0.75, knn_dtype='float32',
+                 word_freq_by_category=False, instrument=False, cache_path=None, cache_max_entries=1000000,
+                 encoder='torch', encoder_threads=None, encoder_batch_size=64, embedding_cache_path=None):
+        self.model_name = model_name
+        self.encoder = make_encoder(encoder, model_name, encoder_threads, encoder_batch_size, embedding_cache_path)
+        self.result_cache = ClassificationCache(cache_path, cache_max_entries) if cache_path else None
+        self._train_fingerprint = None
+        self.stats = TierStats(enabled=instrument)
+        self.word_freq_by_category = word_freq_by_category
+        self.cache_dir = Path(cache_dir)
+        self.use_knn = use_knn
+        self.knn_k = knn_k
+        self.knn_min_similarity = knn_min_similarity
+        self.knn_dtype = knn_dtype
+        self.knn_index = None
+        self.category_systems = None
+        self.keyword_automaton = KeywordAutomaton()
         self.classifiers = {k: None for k in CLASS_CONFIG.keys()}
-        self.vectorizers = {k: TfidfVectorizer(max_features=5000, ngram_range=(1, 2)) for k in CLASS_CONFIG.keys()}
-        self.label_encoders = {k: LabelEncoder() for k in CLASS_CONFIG.keys()}
+        self._vectorizers = None
+        self._label_encoders = None
+        self.train_index = None
+        self._train_data = None
         self.reset_data()
 
+    @property
+    def model(self):
+        # 大部分句子由训练集匹配或关键词决定，向量模型在首次进入向量层时才加载
+        return self.encoder.model
+
+    @property
+    def vectorizers(self):
+        if self._vectorizers is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            self._vectorizers = {
+                k: TfidfVectorizer(max_features=5000, analyzer=JiebaAnalyzer((1, 2))) for k in CLASS_CONFIG.keys()
+            }
+        return self._vectorizers
+
+    @property
+    def label_encoders(self):
+        if self._label_encoders is None:
+            from sklearn.preprocessing import LabelEncoder
+
+            self._label_encoders = {k: LabelEncoder() for k in CLASS_CONFIG.keys()}
+        return self._label_encoders
+
+    def warmup(self):
+        """常驻服务可在启动时预先加载 jieba 词典、向量模型与类别原型"""
+        jieba.initialize()
+        self._load_category_systems()
+        return self
+
+    @property
+    def train_data(self):
+        return self._train_data
+
+    @train_data.setter
+    def train_data(self, df):
+        self.attach_train_data(df)
+
+    def attach_train_data(self, df, train_index=None):
+        # 挂载训练集时一次性建立倒排索引；已有索引（如主进程传给子进程的）可直接复用
+        self._train_data = df.reset_index(drop=True) if df is not None else None
+        if df is not None and train_index is None:
+            train_index = TrainIndex(self._train_data['content'])
+        self.train_index = train_index
+        self.knn_index = None
+        self._train_labels = {
+            k: self._train_data[f'{k}_cat'].tolist() for k in CLASS_CONFIG.keys()
+        } if df is not None else None
+        self._train_fingerprint = None
+        if df is not None:
+            digest = hashlib.sha1()
+            for row in zip(self._train_data['content'].astype(str), *self._train_labels.values()):
+                digest.update("\t".join(map(str, row)).encode('utf-8') + b"\n")
+            self._train_fingerprint = digest.hexdigest()
+
     def reset_data(self):
         self.sentence_data = []
-        self.word_freq = {k: defaultdict(int) for k in CLASS_CONFIG.keys()}
+        self.word_freq = WordFreqStore(by_category=self.word_freq_by_category)
 
     def split_sentences(self, text):
         if not text:
@@ -175,10 +1310,10 @@ class PolicyAnalyzer:
         
         return [s for s in sentences if '乡' in s or '农' in s]
 
-    def calculate_similarity(self, text1, text2):
-        def tokenize(text):
-            return [w for w in jieba.cut(text) if len(w.strip()) > 0]
+    def iter_split_sentences(self, source, chunk_size=65536):
+        return iter_split_sentences(source, chunk_size)
 
+    def calculate_similarity(self, text1, text2):
         def jaccard_sim(tokens1, tokens2):
             set1, set2 = set(tokens1), set(tokens2)
             return len(set1 & set2) / len(set1 | set2) if set1 | set2 else 0.0
@@ -205,75 +1340,591 @@ class PolicyAnalyzer:
             
         return 0.6 * jaccard_sim(tokens1, tokens2) + 0.4 * tfidf_sim(tokens1, tokens2)
 
+    def tokenize_batch(self, sentences):
+        return TOKEN_CACHE.batch(sentences)
+
+    def match_batch(self, sentences):
+        """整篇文档的句子一次性与训练集匹配，返回 [(行号或 None, 相似度), ...]"""
+        if self.train_index is None:
+            return [(None, 0.0) for _ in sentences]
+        self.tokenize_batch(sentences)
+        rows, scores = self.train_index.match_batch([tokenize(s) for s in sentences])
+        return [(int(r) if r >= 0 else None, float(sc)) for r, sc in zip(rows, scores)]
+
+    def _train_match_result(self, row_idx, similarity, system_name):
+        if row_idx is None or similarity < SIM_THRESHOLD:
+            return None
+        return {"category": self._train_labels[system_name][row_idx], "confidence": similarity, "source": "train_match"}
+
     def _classify(self, sentence, system_name):
-        if hasattr(self, 'train_data'):
-            best_match = None
-            max_similarity = 0
-            
-            for _, row in self.train_data.iterrows():
-                similarity = self.calculate_similarity(sentence, str(row['content']))
-                if similarity > max_similarity:
-                    max_similarity = similarity
-                    best_match = row
-                    if similarity >= 0.85:
-                        return {"category": row[f'{system_name}_cat'], "confidence": similarity}
-            
-            if max_similarity >= 0.8:
-                return {"category": best_match[f'{system_name}_cat'], "confidence": max_similarity}
-        
-        if self.classifiers[system_name] is not None:
-            try:
-                X = self.vectorizers[system_name].transform([sentence])
-                y_pred = self.classifiers[system_name].predict(X)
-                y_pred_proba = self.classifiers[system_name].predict_proba(X)
-                return {
-                    "category": self.label_encoders[system_name].inverse_transform(y_pred)[0],
-                    "confidence": float(max(y_pred_proba[0]))
-                }
-            except Exception:
-                pass
-        
+        if self.train_index is not None:
+            row_idx, max_similarity = self.train_index.match(tokenize(sentence))
+            result = self._train_match_result(row_idx, max_similarity, system_name)
+            if result is not None:
+                return result
+
+        return self._fallback_classify(sentence, system_name)
+
+    def _fallback_classify(self, sentence, system_name):
+        result = self._lr_classify(sentence, system_name)
+        if result is not None:
+            return result
         return self._semantic_classify(sentence, system_name)
 
+    def _lr_classify(self, sentence, system_name):
+        results = self._lr_classify_batch([sentence], system_name)
+        return results[0] if results else None
+
+    def _lr_classify_batch(self, sentences, system_name):
+        # 一篇文档中未命中训练集的句子一次性向量化与预测
+        if self.classifiers[system_name] is not None and sentences:
+            try:
+                results = self.classifiers[system_name].predict(sentences)
+            except Exception as e:
+                self.stats.errors["lr"] += 1
+                warnings.warn(f"逻辑回归层预测失败 ({system_name}): {e}", RuntimeWarning, stacklevel=2)
+                return None
+            for result in results:
+                result["source"] = "lr"
+            return results
+        return None
+
+    def fit(self, train_df=None):
+        """用训练集（默认 self.train_data）为三个体系训练 TF-IDF + LogisticRegression"""
+        from sklearn.linear_model import LogisticRegression
+
+        train_df = self.train_data if train_df is None else train_df
+        contents = [str(c) for c in train_df['content']]
+        for system_name in CLASS_CONFIG.keys():
+            label_encoder = self.label_encoders[system_name]
+            y = label_encoder.fit_transform(train_df[f'{system_name}_cat'].astype(str))
+            if len(label_encoder.classes_) < 2:
+                self.classifiers[system_name] = None
+                continue
+            vectorizer = self.vectorizers[system_name]
+            X = vectorizer.fit_transform(contents)
+            classifier = LogisticRegression(max_iter=1000).fit(X, y)
+            self.classifiers[system_name] = LinearTier.from_sklearn(vectorizer, classifier, label_encoder)
+        return self
+
+    def save(self, path):
+        """把已训练的分类层保存为 .npy 数组与 manifest.json，供 load 以 memmap 方式加载"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        manifest = {"config_hash": config_hash(), "systems": {}}
+        for system_name, classifier in self.classifiers.items():
+            if classifier is not None:
+                manifest["systems"][system_name] = classifier.save(path, system_name)
+        with open(path / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return path
+
+    def load(self, path, mmap_mode='r'):
+        path = Path(path)
+        with open(path / "manifest.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("config_hash") != config_hash():
+            warnings.warn(f"{path} 的 CLASS_CONFIG 哈希与当前配置不一致", UserWarning, stacklevel=2)
+        for system_name in CLASS_CONFIG.keys():
+            meta = manifest["systems"].get(system_name)
+            self.classifiers[system_name] = LinearTier.load(path, system_name, meta, mmap_mode) if meta else None
+        return self
+
+    def _keyword_classify(self, sentence, system_name, keyword_hits=None):
+        if keyword_hits is None:
+            keyword_hits = self.keyword_automaton.match(sentence)
+        category = keyword_hits.get(system_name)
+        if category is not None:
+            return {"category": category, "confidence": 1.0, "source": "keyword"}
+        return None
+
     def _semantic_classify(self, sentence, system_name):
-        if system_name in CLASS_CONFIG and "categories" in CLASS_CONFIG[system_name]:
-            for category, keywords in CLASS_CONFIG[system_name]["categories"].items():
-                if any(keyword.lower() in sentence.lower() for keyword in keywords):
-                    return {"category": category, "confidence": 1.0}
-        
-        embeddings = self.category_systems[system_name]["embeddings"]
-        sentence_embedding = self.model.encode([sentence])
-        similarities = cosine_similarity(sentence_embedding, embeddings)[0]
-        max_index = np.argmax(similarities)
-        
+        result = self._keyword_classify(sentence, system_name)
+        if result is not None:
+            return result
+        return self._embedding_classify([sentence], {system_name: [0]})[system_name][0]
+
+    def _prototype_cache_path(self):
+        return self.cache_dir / f"prototypes_{model_key(self.encoder.key)}_{config_hash()}.npz"
+
+    def _load_category_systems(self):
+        # 类别原型向量 = 该类全部关键词向量的归一化均值，按模型名与配置哈希缓存到磁盘
+        if self.category_systems is not None:
+            return self.category_systems
+
+        cache_path = self._prototype_cache_path()
+        if cache_path.exists():
+            try:
+                with open(cache_path, 'rb') as f, np.load(f, allow_pickle=False) as cached:
+                    self.category_systems = {
+                        k: {"categories": cached[f"{k}_categories"].tolist(), "embeddings": cached[f"{k}_embeddings"]}
+                        for k in CLASS_CONFIG.keys()
+                    }
+                return self.category_systems
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                # 缓存损坏时重新计算并覆盖
+                warnings.warn(f"类别原型缓存无法读取，重新计算: {e}", RuntimeWarning, stacklevel=2)
+
+        keywords, owners = [], []
+        for system_name, config in CLASS_CONFIG.items():
+            for category, terms in config["categories"].items():
+                keywords.extend(terms)
+                owners.extend([(system_name, category)] * len(terms))
+        keyword_embeddings = normalize_rows(self.encoder.encode(keywords, batch_size=256))
+
+        self.category_systems = {}
+        arrays = {}
+        for system_name, config in CLASS_CONFIG.items():
+            categories = list(config["categories"].keys())
+            prototypes = np.stack([
+                keyword_embeddings[[i for i, owner in enumerate(owners) if owner == (system_name, category)]].mean(axis=0)
+                for category in categories
+            ])
+            prototypes = normalize_rows(prototypes)
+            self.category_systems[system_name] = {"categories": categories, "embeddings": prototypes}
+            arrays[f"{system_name}_categories"] = np.array(categories)
+            arrays[f"{system_name}_embeddings"] = prototypes
+
+        tmp_path = None
+        try:
+            tmp_path = unique_temp_path(cache_path)
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            warnings.warn(f"保存类别原型缓存失败: {e}", RuntimeWarning, stacklevel=2)
+        finally:
+            if tmp_path is not None and tmp_path.exists():
+                tmp_path.unlink()
+        return self.category_systems
+
+    def _load_knn_index(self):
+        if self.knn_index is None and self.train_data is not None:
+            self.knn_index = EmbeddingIndex.load_or_build(
+                self.encoder.encode, self.train_data['content'].tolist(), self._train_labels,
+                self.encoder.key, self.cache_dir, dtype=self.knn_dtype,
+            )
+        return self.knn_index
+
+    def _encode(self, sentences, ids, known=None):
+        """对 ids 对应的句子编码（已编码的直接复用），返回 {下标: 归一化向量}"""
+        known = {} if known is None else known
+        missing = [i for i in ids if i not in known]
+        if missing:
+            embeddings = normalize_rows(self.encoder.encode([sentences[i] for i in missing]))
+            known.update(zip(missing, embeddings))
+        return known
+
+    def _knn_classify(self, sentences, ids, known=None):
+        """训练集近邻投票，返回 {下标: {体系: 结果}}，只保留最高相似度达到阈值的句子"""
+        index = self._load_knn_index()
+        if index is None or not ids:
+            return {}
+        known = self._encode(sentences, ids, known)
+        votes = index.vote(np.stack([known[i] for i in ids]), k=self.knn_k)
         return {
-            "category": self.category_systems[system_name]["categories"][max_index],
-            "confidence": float(similarities[max_index])
+            i: {k: dict(result, source="knn") for k, result in by_system.items()}
+            for i, (top_sim, by_system) in zip(ids, votes) if top_sim >= self.knn_min_similarity
         }
 
-    def analyze(self, text):
+    def _embedding_classify(self, sentences, pending, known=None):
+        """pending: {体系: [句子下标, ...]}；所有待定句子只 encode 一次，再与各体系原型做一次矩阵乘"""
+        category_systems = self._load_category_systems()
+        unique_ids = sorted({i for ids in pending.values() for i in ids})
+        known = self._encode(sentences, unique_ids, known)
+
+        results = {}
+        for system_name, ids in pending.items():
+            system = category_systems[system_name]
+            similarities = np.stack([known[i] for i in ids]) @ system["embeddings"].T
+            best = similarities.argmax(axis=1)
+            results[system_name] = [
+                {"category": system["categories"][j], "confidence": float(similarities[n, j]), "source": "embedding"}
+                for n, j in enumerate(best)
+            ]
+        return results
+
+    def cache_fingerprint(self):
+        """决定分类结果的全部因素的指纹：配置、训练集、模型、已训练的分类层与 kNN 参数"""
+        digest = hashlib.sha1()
+        digest.update(f"{config_hash()}|{self._train_fingerprint}|{self.encoder.key}|{SIM_THRESHOLD}|"
+                      f"{self.use_knn}|{self.knn_k}|{self.knn_min_similarity}|{self.knn_dtype}".encode('utf-8'))
+        for system_name in CLASS_CONFIG.keys():
+            classifier = self.classifiers[system_name]
+            if classifier is not None:
+                digest.update(system_name.encode('utf-8'))
+                digest.update(np.ascontiguousarray(classifier.coef).tobytes())
+                digest.update(np.ascontiguousarray(classifier.intercept).tobytes())
+        return digest.hexdigest()
+
+    def classify_sentences(self, sentences):
+        """批量分类一篇文档的句子，返回 [{体系: {"category", "confidence", "source"}}, ...]
+
+        设置了 cache_path 时整篇文档一次批量查询缓存，只对未命中的句子走完整流程。
+        """
+        if self.result_cache is None or not sentences:
+            return self._classify_uncached(sentences)
+
+        started = self.stats.start()
+        fingerprint = self.cache_fingerprint()
+        keys = [ClassificationCache.make_key(fingerprint, sentence) for sentence in sentences]
+        cached = self.result_cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        self.stats.record("cache", started, len(sentences), len(sentences) - len(missing))
+
+        computed = self._classify_uncached([sentences[i] for i in missing]) if missing else []
+        self.result_cache.put_many({keys[i]: result for i, result in zip(missing, computed)})
+        by_index = dict(zip(missing, computed))
+        return [by_index[i] if i in by_index else cached[key] for i, key in enumerate(keys)]
+
+    def cache_stats(self):
+        return self.result_cache.stats() if self.result_cache is not None else None
+
+    def _classify_uncached(self, sentences):
+        stats = self.stats
+        n_systems = len(CLASS_CONFIG)
+
+        # 每个句子只与训练集匹配一次，三个分类体系共用同一最佳行
+        started = stats.start()
+        matches = self.match_batch(sentences)
+        missed = [i for i, (row_idx, similarity) in enumerate(matches)
+                  if row_idx is None or similarity < SIM_THRESHOLD]
+        stats.record("train_match", started, len(sentences) * n_systems, (len(sentences) - len(missed)) * n_systems)
+
+        results = [{} for _ in sentences]
+        pending = defaultdict(list)
+        keyword_hits = {}
+        embeddings = {}
+
+        # 词面匹配失败的句子可选地用训练集句向量近邻投票，同样一次覆盖三个体系
+        knn_results = {}
+        if self.use_knn and missed:
+            started = stats.start()
+            knn_results = self._knn_classify(sentences, missed, embeddings)
+            stats.record("knn", started, len(missed) * n_systems, len(knn_results) * n_systems)
+
+        for system_name in CLASS_CONFIG.keys():
+            unresolved = []
+            for i, (row_idx, similarity) in enumerate(matches):
+                result = self._train_match_result(row_idx, similarity, system_name)
+                if result is None and i in knn_results:
+                    result = knn_results[i][system_name]
+                if result is None:
+                    unresolved.append(i)
+                else:
+                    results[i][system_name] = result
+            if not unresolved:
+                continue
+
+            if self.classifiers[system_name] is not None:
+                started = stats.start()
+                lr_results = self._lr_classify_batch([sentences[i] for i in unresolved], system_name)
+                stats.record("lr", started, len(unresolved), len(unresolved) if lr_results is not None else 0)
+                if lr_results is not None:
+                    for i, result in zip(unresolved, lr_results):
+                        results[i][system_name] = result
+                    continue
+
+            started = stats.start()
+            for i in unresolved:
+                if i not in keyword_hits:
+                    keyword_hits[i] = self.keyword_automaton.match(sentences[i])
+                result = self._keyword_classify(sentences[i], system_name, keyword_hits[i])
+                if result is None:
+                    pending[system_name].append(i)
+                else:
+                    results[i][system_name] = result
+            stats.record("keyword", started, len(unresolved), len(unresolved) - len(pending[system_name]))
+
+        if pending:
+            started = stats.start()
+            for system_name, system_results in self._embedding_classify(sentences, pending, embeddings).items():
+                for i, result in zip(pending[system_name], system_results):
+                    results[i][system_name] = result
+            n_pending = sum(len(ids) for ids in pending.values())
+            stats.record("embedding", started, n_pending, n_pending)
+        return results
+
+    def stats_snapshot(self):
+        """各分类层统计的快照（需以 instrument=True 创建或设置 stats.enabled）"""
+        return self.stats.snapshot()
+
+    @contextmanager
+    def profile(self, output_file=None, sort='cumulative', limit=30):
+        """用 cProfile 包裹一段分析代码：写入 output_file，或打印耗时最多的 limit 个函数"""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            if output_file:
+                profiler.dump_stats(output_file)
+            else:
+                pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+
+    def _analyze_text(self, text):
+        """分析单篇文本而不修改实例状态，返回 (句子记录列表, 本篇的 WordFreqStore)"""
+        rows, word_counts = [], WordFreqStore(by_category=self.word_freq_by_category)
         if not text:
-            return
+            return rows, word_counts
         
         sentences = self.split_sentences(text)
         if not sentences:
-            return
+            return rows, word_counts
         
-        for idx, sentence in enumerate(sentences, 1):
+        rows = self._sentence_rows(sentences, 1, word_counts)
+        self.stats.record_document(len(sentences))
+        return rows, word_counts
+
+    def _sentence_rows(self, sentences, first_id, word_counts):
+        """分类一批句子并生成记录（句子编号从 first_id 开始），词频累加到 word_counts"""
+        rows = []
+        token_lists = self.tokenize_batch(sentences)
+        results = self.classify_sentences(sentences)
+
+        for idx, (sentence, tokens, result_by_system) in enumerate(zip(sentences, token_lists, results), first_id):
             classification = {"sentence_id": idx, "content": sentence}
             
             for system_name in CLASS_CONFIG.keys():
-                result = self._classify(sentence, system_name)
+                result = result_by_system[system_name]
                 classification[f"{system_name}_cat"] = result["category"]
                 classification[f"{system_name}_conf"] = result["confidence"]
-                
-                for word in [w for w in jieba.lcut(sentence) if len(w) > 1 and not w.isdigit()]:
-                    self.word_freq[system_name][word] += 1
-            
-            self.sentence_data.append(classification)
+                classification[f"{system_name}_source"] = result.get("source")
+
+            word_counts.add(frequency_words(tokens),
+                            {k: classification[f"{k}_cat"] for k in CLASS_CONFIG.keys()})
+            rows.append(classification)
+        return rows
+
+    def _merge_word_counts(self, word_counts):
+        self.word_freq.merge(word_counts)
+
+    def analyze(self, text):
+        rows, word_counts = self._analyze_text(text)
+        self.sentence_data.extend(rows)
+        self._merge_word_counts(word_counts)
+
+    def analyze_corpus(self, docs, workers=None, chunksize=4, mp_context=None):
+        """多进程分析整个语料库
+
+        docs 可以是 {doc_id: text}、[(doc_id, text), ...] 或文本列表（以下标作为 doc_id）。
+        每个工作进程只加载一次模型与训练集索引；结果按 docs 的顺序合并，
+        句子记录带 doc_id 与文档内的 sentence_id。
+        """
+        items = list(iter_documents(docs))
+        workers = workers or os.cpu_count() or 1
+
+        if workers <= 1 or len(items) <= 1:
+            outputs = (self._analyze_document(doc_id, text) for doc_id, text in items)
+            self._merge_corpus_outputs(outputs)
+            return
+
+        with self.corpus_executor(workers, mp_context) as executor:
+            self._merge_corpus_outputs(executor.map(analyze_corpus_document, items, chunksize=chunksize))
+
+    def corpus_executor(self, workers, mp_context=None):
+        """创建分析进程池：每个工作进程按本分析器的配置初始化一次
+
+        向其提交 analyze_corpus_document((doc_id, text))，结果交给 merge_worker_output 合并。
+        """
+        return ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                   initializer=init_corpus_worker, initargs=self._corpus_worker_initargs())
+
+    def _corpus_worker_initargs(self):
+        # 工作进程据此重建同配置的分析器，并复用训练集索引、已训练的分类层与类别原型；
+        # 类别原型与 kNN 向量文件先在主进程建好，子进程不再各自编码关键词与整个训练集
+        category_systems = self._load_category_systems()
+        if self.use_knn:
+            self._load_knn_index()
+        options = {"model_name": self.model_name, "cache_dir": str(self.cache_dir), "use_knn": self.use_knn,
+                   "knn_k": self.knn_k, "knn_min_similarity": self.knn_min_similarity, "knn_dtype": self.knn_dtype,
+                   "word_freq_by_category": self.word_freq_by_category, "instrument": self.stats.enabled,
+                   "cache_path": self.result_cache.path if self.result_cache is not None else None,
+                   "cache_max_entries": self.result_cache.max_entries if self.result_cache is not None else None,
+                   "encoder": self.encoder}
+        return (options, self.train_data, self.train_index, self.classifiers, self.knn_index, category_systems)
+
+    def iter_analyze(self, texts):
+        """逐条产出句子分类记录的生成器，不累积到 sentence_data，内存占用与语料规模无关
+
+        texts 的形式同 analyze_corpus；词频仍会累加到 word_freq（其大小只取决于词表）。
+        """
+        for doc_id, text in iter_documents(texts):
+            if hasattr(text, 'read'):
+                yield from self._iter_analyze_stream(doc_id, text)
+                continue
+            _, rows, word_counts = self._analyze_document(doc_id, text)
+            self._merge_word_counts(word_counts)
+            yield from rows
+
+    def _iter_analyze_stream(self, doc_id, source, batch_size=512):
+        # 超大文档（文件对象）：流式切句，每 batch_size 句分类一次
+        word_counts = WordFreqStore(by_category=self.word_freq_by_category)
+        batch, next_id, total = [], 1, 0
+        for sentence in self.iter_split_sentences(source):
+            batch.append(sentence)
+            if len(batch) >= batch_size:
+                for row in self._sentence_rows(batch, next_id, word_counts):
+                    yield {"doc_id": doc_id, **row}
+                next_id += len(batch)
+                batch = []
+        if batch:
+            for row in self._sentence_rows(batch, next_id, word_counts):
+                yield {"doc_id": doc_id, **row}
+            next_id += len(batch)
+        if next_id > 1:
+            self.stats.record_document(next_id - 1)
+        self._merge_word_counts(word_counts)
+
+    def analyze_to(self, texts, output_file, batch_size=10000):
+        """边分析边按批写入 Parquet / CSV，返回写出的句子数"""
+        with ResultSink(output_file, batch_size=batch_size) as sink:
+            for record in self.iter_analyze(texts):
+                sink.write(record)
+        return sink.count
+
+    def _analyze_document(self, doc_id, text):
+        rows, word_counts = self._analyze_text(text)
+        return doc_id, [{"doc_id": doc_id, **row} for row in rows], word_counts
+
+    def _merge_corpus_outputs(self, outputs):
+        for output in outputs:
+            self.sentence_data.extend(self.merge_worker_output(output))
+
+    def merge_worker_output(self, output):
+        """合并一篇文档的词频与工作进程统计增量，返回其句子记录（不加入 sentence_data）"""
+        _, rows, word_counts = output[:3]
+        self._merge_word_counts(word_counts)
+        extras = output[3] if len(output) > 3 else {}
+        if "stats" in extras:
+            self.stats.merge(extras["stats"])
+        if "cache" in extras and self.result_cache is not None:
+            self.result_cache.hits += extras["cache"][0]
+            self.result_cache.misses += extras["cache"][1]
+        return rows
 
     def get_results(self):
+        import pandas as pd
+
         return {
             "sentences": pd.DataFrame(self.sentence_data),
             "word_frequencies": self.word_freq
         }
+
+
+# ==================== 结果输出 ====================
+class ResultSink:
+    """按固定批量把句子记录追加写入 Parquet 或 CSV，*_cat 列使用 category 类型
+
+    append=True 时接着已有的 CSV 写（沿用其表头的列顺序），Parquet 文件无法追加，已存在时报错。
+    on_flush 在每次写盘后回调，此前 write 的记录都已落盘。
+    """
+
+    def __init__(self, output_file, batch_size=10000, file_format=None, append=False, on_flush=None):
+        self.output_file = Path(output_file)
+        self.batch_size = batch_size
+        self.file_format = file_format or ('parquet' if self.output_file.suffix == '.parquet' else 'csv')
+        self.on_flush = on_flush
+        self.count = 0
+        self._buffer = []
+        self._writer = None
+        self._schema = None
+        self._started = False
+        self._columns = None
+        if append and self.output_file.exists() and self.output_file.stat().st_size:
+            if self.file_format == 'parquet':
+                raise FileExistsError(f"Parquet 文件无法追加写入: {self.output_file}")
+            with open(self.output_file, encoding='utf-8-sig', newline='') as f:
+                self._columns = next(csv.reader(f))
+            self._started = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, record):
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        if self._buffer:
+            self._write_buffer()
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def _write_buffer(self):
+        import pandas as pd
+
+        df = pd.DataFrame(self._buffer)
+        self._buffer = []
+        for column in df.columns:
+            if column.endswith('_cat'):
+                df[column] = df[column].astype('category')
+
+        if not self._started:
+            self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        if self.file_format == 'parquet':
+            self._write_parquet(df)
+        else:
+            # 仅首批写入表头与 BOM，之后以追加方式写入；各批按首批（或已有文件）的列顺序对齐
+            if self._columns is None:
+                self._columns = list(df.columns)
+            df = df.reindex(columns=self._columns)
+            df.to_csv(self.output_file, mode='a' if self._started else 'w', header=not self._started,
+                      index=False, encoding='utf-8' if self._started else 'utf-8-sig')
+        self._started = True
+        self.count += len(df)
+
+    def _write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(str(self.output_file), self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+# ==================== 多进程语料分析 ====================
+_WORKER_ANALYZER = None
+
+
+def init_corpus_worker(options, train_data, train_index, classifiers, knn_index, category_systems=None):
+    global _WORKER_ANALYZER
+    _WORKER_ANALYZER = PolicyAnalyzer(**options)
+    _WORKER_ANALYZER.classifiers = classifiers
+    _WORKER_ANALYZER.category_systems = category_systems
+    if train_data is not None:
+        _WORKER_ANALYZER.attach_train_data(train_data, train_index)
+        _WORKER_ANALYZER.knn_index = knn_index
+
+
+def analyze_corpus_document(item):
+    """在工作进程中分析一篇文档，返回 (doc_id, 句子记录, 词频, 统计增量)"""
+    doc_id, text = item
+    output = _WORKER_ANALYZER._analyze_document(doc_id, text)
+    # 工作进程的统计增量随结果一起返回，由主进程合并
+    extras = {}
+    stats = _WORKER_ANALYZER.stats
+    if stats.enabled:
+        extras["stats"] = stats.snapshot()
+        stats.reset()
+    cache = _WORKER_ANALYZER.result_cache
+    if cache is not None:
+        extras["cache"] = (cache.hits, cache.misses)
+        cache.hits = cache.misses = 0
+    return (*output, extras)
@@ -0,0 +1,50 @@
+"""本地 HTTP 夹具服务器：用保存下来的 zj.gov.cn 列表页 / 详情页 HTML 代替线上站点
+
+目录结构：
+    fixtures/list_1.html, list_2.html, ...   列表页，对应 index.html?pageNum=N
+    fixtures/<其它路径>                        详情页等，按 URL 路径原样查找
+
+    python fixture_server.py fixtures --port 8000
+    python scrawlpolices.py --base-url "http://127.0.0.1:8000/col/col1229697834/index.html?pageNum={}" --pages 3
+"""
+import argparse
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    def translate_path(self, path):
+        parsed = urlparse(path)
+        page = parse_qs(parsed.query).get('pageNum')
+        if parsed.path.endswith('/index.html') and page:
+            return super().translate_path(f"/list_{page[0]}.html")
+        return super().translate_path(parsed.path)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory, host='127.0.0.1', port=0):
+    """在后台线程中启动服务器，返回 (server, base_url)；用完后调用 server.shutdown()"""
+    server = ThreadingHTTPServer((host, port), partial(FixtureHandler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 HTTP 夹具服务器")
+    parser.add_argument('directory')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), partial(FixtureHandler, directory=args.directory))
+    print(f"serving {args.directory} at http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
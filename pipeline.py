@@ -0,0 +1,170 @@
+"""抓取—分类一体化流水线：边抓取政策边对正文做句子级分类
+
+抓取线程把每条新政策放入有界队列，主线程取出后交给分析进程池；队列长度与在途文档数都有上限，
+分析跟不上时抓取线程阻塞在入队处（背压），内存占用不随抓取规模增长。
+句子记录按文档完成顺序流式写入 Parquet / CSV，每行带上政策的元数据。
+
+    python pipeline.py --pages 3 --output policy_sentences.csv
+    python fixture_server.py fixtures --port 8000 &
+    python pipeline.py --pages 3 --base-url "http://127.0.0.1:8000/col/col1229697834/index.html?pageNum={}"
+"""
+import argparse
+import itertools
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+
+from count_sentence import PolicyAnalyzer, ResultSink, analyze_corpus_document
+from scrawlpolices import BASE_URL_TEMPLATE, TOTAL_PAGES, CheckpointStore, crawl_concurrent, create_driver
+
+METADATA_FIELDS = ['文件名称', '文号', '发布日期', '主题分类', '来源']
+_DONE = object()
+
+
+def run_pipeline(analyzer, page_numbers, output_file, base_url_template=BASE_URL_TEMPLATE, crawl_workers=2,
+                 analyze_workers=None, queue_size=16, max_in_flight=None, min_interval=1.0, store=None,
+                 http_first=True, driver_factory=create_driver, batch_size=10000, mp_context=None):
+    """抓取 page_numbers 对应的列表页，对每条新政策的正文分类，句子记录流式写入 output_file
+
+    analyze_workers <= 1 时在主线程中分析（抓取仍在后台线程进行）；否则最多 max_in_flight
+    （默认 2 * analyze_workers）篇文档同时在进程池中。
+    传入 store（CheckpointStore）时可断点续跑：已抓取的政策不再抓取，句子记录落盘后才标记为已分析，
+    上次已抓取但未分析完的政策先补做；CSV 输出接着已有文件追加（Parquet 已存在时报错），
+    doc_id 取政策在断点存储中的序号，跨运行不重复。
+    返回 {"policies": 分析的政策数, "sentences": 写出的句子数, "failed_pages": 抓取失败的页码}
+    """
+    analyze_workers = 1 if analyze_workers is None else analyze_workers
+    max_in_flight = max_in_flight or 2 * analyze_workers
+    policies = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+    summary = {"policies": 0, "sentences": 0, "failed_pages": []}
+    doc_ids = itertools.count()
+
+    def put(item):
+        # 队列满时阻塞抓取线程；下游出错后不再入队，避免抓取线程永久阻塞
+        while not stopped.is_set():
+            try:
+                policies.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    def metadata_of(policy):
+        return {field: policy.get(field, '') for field in METADATA_FIELDS}
+
+    def on_policy(policy):
+        # 正文已写入断点存储，取出后不再留在抓取结果中，抓取端只保留元数据
+        doc_id = store.policy_seq(policy) if store is not None else next(doc_ids)
+        put((doc_id, metadata_of(policy), policy.pop('正文', '')))
+
+    def crawl():
+        try:
+            if store is not None:
+                for seq, policy in store.unanalyzed_policies():
+                    put((seq, metadata_of(policy), policy.get('正文', '')))
+            _, summary["failed_pages"] = crawl_concurrent(
+                page_numbers, base_url_template, workers=crawl_workers, min_interval=min_interval,
+                driver_factory=driver_factory, store=store, http_first=http_first, on_policy=on_policy,
+            )
+        except Exception as e:
+            print(f"抓取过程中出错: {e}")
+        finally:
+            put(_DONE)
+
+    metadata = {}
+    written = []  # 记录已交给 sink、等待落盘后标记为已分析的政策
+
+    def on_flush():
+        if store is not None:
+            store.mark_analyzed(written)
+        written.clear()
+
+    def emit(output, sink):
+        meta = metadata.pop(output[0])
+        rows = analyzer.merge_worker_output(output)
+        for row in rows:
+            sink.write({**meta, **row})
+        # 写完整篇之后才登记：批量写盘可能发生在文档中途，此时本篇还不能算已分析
+        written.append(meta)
+        summary["sentences"] += len(rows)
+
+    def items():
+        while True:
+            item = policies.get()
+            if item is _DONE:
+                return
+            doc_id, meta, text = item
+            metadata[doc_id] = meta
+            summary["policies"] += 1
+            yield doc_id, text
+
+    crawler = threading.Thread(target=crawl, daemon=True)
+    try:
+        with ResultSink(output_file, batch_size=batch_size, append=store is not None, on_flush=on_flush) as sink:
+            if analyze_workers <= 1:
+                crawler.start()
+                for doc_id, text in items():
+                    emit(analyzer._analyze_document(doc_id, text), sink)
+            else:
+                # 抓取线程已在运行，fork 子进程不安全，默认用 spawn
+                mp_context = mp_context or multiprocessing.get_context('spawn')
+                with analyzer.corpus_executor(analyze_workers, mp_context) as executor:
+                    crawler.start()
+                    pending = set()
+                    for item in items():
+                        if len(pending) >= max_in_flight:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                emit(future.result(), sink)
+                        pending.add(executor.submit(analyze_corpus_document, item))
+                    for future in wait(pending).done:
+                        emit(future.result(), sink)
+        crawler.join()
+    finally:
+        # 出错退出时抓取线程不再入队，随进程结束
+        stopped.set()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="边抓取浙江省政府规范性文件边做句子级分类")
+    parser.add_argument('--base-url', default=BASE_URL_TEMPLATE, help="列表页 URL 模板，{} 处填页码")
+    parser.add_argument('--pages', type=int, default=TOTAL_PAGES)
+    parser.add_argument('--crawl-workers', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=1, help="分析进程数，1 表示在主进程中分析")
+    parser.add_argument('--queue-size', type=int, default=16, help="抓取与分析之间的队列长度")
+    parser.add_argument('--min-interval', type=float, default=1.0, help="同一主机两次请求的最小间隔（秒）")
+    parser.add_argument('--output', default='policy_sentences.csv', help="输出文件，.parquet 后缀写 Parquet")
+    parser.add_argument('--checkpoint', help="断点存储文件：中断后重跑只补做未完成的抓取与分析，结果追加到 --output")
+    parser.add_argument('--no-http', action='store_true', help="不尝试直接请求 HTML，全部使用浏览器")
+    parser.add_argument('--train-data', default=str(Path(__file__).parent / 'train_data.csv'))
+    parser.add_argument('--model-dir', help="PolicyAnalyzer.save 保存的逻辑回归分类层目录")
+    parser.add_argument('--encoder', default='torch', help="句向量后端：torch 或 int8")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    analyzer = PolicyAnalyzer(encoder=args.encoder)
+    analyzer.train_data = pd.read_csv(args.train_data, sep='\t')
+    if args.model_dir:
+        analyzer.load(args.model_dir)
+
+    store = CheckpointStore(args.checkpoint) if args.checkpoint else None
+    try:
+        summary = run_pipeline(analyzer, range(1, args.pages + 1), args.output, args.base_url,
+                               crawl_workers=args.crawl_workers, analyze_workers=args.workers,
+                               queue_size=args.queue_size, min_interval=args.min_interval, store=store,
+                               http_first=not args.no_http)
+    finally:
+        if store is not None:
+            store.close()
+
+    print(f"分析 {summary['policies']} 条政策，写出 {summary['sentences']} 条句子记录: {args.output}")
+    if summary["failed_pages"]:
+        print(f"以下页面抓取失败: {summary['failed_pages']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,24 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 import pandas as pd
 from pathlib import Path
+from urllib.parse import urljoin, urlparse
+from urllib.request import Request, urlopen
+import argparse
+import json
+import queue
+import sqlite3
+import threading
 import time
 
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # 未安装 lxml 时只能使用 Selenium
+    etree = lxml_html = None
+
+BASE_URL_TEMPLATE = 'https://www.zj.gov.cn/col/col1229697834/index.html?number=C0103&pageNum={}'
+TOTAL_PAGES = 136
+
 def retry_on_stale_element(max_attempts=3, delay=1):
     """处理 StaleElementReferenceException 的装饰器"""
     def decorator(func):
@@ -22,12 +38,19 @@ def retry_on_stale_element(max_attempts=3, delay=1):
         return wrapper
     return decorator
 
+def read_detail_body(driver):
+    """读取浏览器当前详情页的正文，候选容器见 DETAIL_BODY_CANDIDATES"""
+    for xpath in DETAIL_BODY_CANDIDATES:
+        bodies = driver.find_elements(By.XPATH, xpath)
+        if bodies:
+            return bodies[0].text.strip()
+    return ""
+
 @retry_on_stale_element(max_attempts=3)
 def get_policy_detail(driver, url):
-    """获取政策详细信息"""
+    """获取政策详细信息；页面加载失败时返回 None，由调用方重试或记为失败"""
     try:
         driver.get(url)
-        time.sleep(2)  # 等待页面加载
         
         # 等待表格加载，添加更长的超时时间
         wait = WebDriverWait(driver, 15)
@@ -51,113 +74,101 @@ def get_policy_detail(driver, url):
             print(f"未找到主题分类信息: {e}")
             policy_detail['主题分类'] = ""
         
+        policy_detail['正文'] = read_detail_body(driver)
         return policy_detail
     
     except Exception as e:
         print(f"获取政策详情失败: {e}")
-        return {'主题分类': ""}
+        return None
 
-def get_policy_list(driver, page_url):
-    """使用Selenium获取单页政策列表"""
+def get_policy_detail_in_tab(driver, url):
+    """在新标签页中打开详情页读取主题分类与正文，列表页留在原标签页；失败时返回 None"""
+    try:
+        # 打开新标签页
+        driver.execute_script(f"window.open('{url}', '_blank');")
+        
+        # 等待新标签页打开后切换
+        WebDriverWait(driver, 10).until(lambda d: len(d.window_handles) > 1)
+        driver.switch_to.window(driver.window_handles[-1])
+        
+        # 等待详细信息加载
+        wait = WebDriverWait(driver, 10)
+        wait.until(EC.presence_of_element_located((By.CLASS_NAME, "xxgk")))
+        
+        # 获取主题分类
+        theme = driver.execute_script("""
+            var thElement = document.evaluate("//th[contains(text(), '主题分类')]", 
+                document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            if (thElement) {
+                var tdElement = thElement.nextElementSibling;
+                return tdElement ? tdElement.textContent : '';
+            }
+            return '';
+        """)
+        detail = {'主题分类': theme.strip() if theme else "", '正文': read_detail_body(driver)}
+        
+        # 关闭详细页面标签
+        driver.close()
+        
+        # 切回主页面
+        driver.switch_to.window(driver.window_handles[0])
+        return detail
+    
+    except Exception as e:
+        print(f"获取详细信息失败: {e}")
+        # 确保切回主页面
+        if len(driver.window_handles) > 1:
+            driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+        return None
+
+def get_policy_list(driver, page_url, on_policy=None, is_known=None, fetcher=None):
+    """使用Selenium获取单页政策列表
+    
+    on_policy: 每获取完一条政策立即回调（用于写入断点存储）；详情获取失败的政策标记 '抓取失败'，不回调
+    is_known: 判断来源 URL 是否已抓取过，已抓取的政策不再打开详情页
+    fetcher: 传入 HttpFetcher 时详情页先直接请求 HTML，解析不到时才在浏览器标签页中打开
+    """
     max_retries = 3
     for retry in range(max_retries):
         try:
             # 访问页面
             driver.get(page_url)
-            time.sleep(5)  # 等待页面加载
-            
-            # 等待内容加载
-            wait = WebDriverWait(driver, 15)
             
-            # 确保页面框架加载完成
-            wait.until(
-                EC.presence_of_element_located((By.CLASS_NAME, "simple_pgContainer"))
-            )
+            # 等待内容加载：分页控件与列表项都出现后再读取，不再固定等待
+            wait_for_list_page(driver)
             
             page_policies = []
             
-            # 使用JavaScript获取所有政策项
-            items = driver.execute_script("""
-                return document.getElementsByClassName('xzgfx_list_item');
-            """)
+            # 一次脚本调用取回所有政策项
+            policies = extract_list_items(driver, page_url)
             
-            print(f"找到 {len(items)} 条政策")
+            print(f"找到 {len(policies)} 条政策")
             
-            for item in items:
+            for policy in policies:
                 try:
-                    policy = {}
-                    
-                    # 使用JavaScript获取元素文本和属性
-                    title_info = driver.execute_script("""
-                        var item = arguments[0];
-                        var titleElement = item.querySelector('.xzgfx_list_title2 a');
-                        return {
-                            title: titleElement ? titleElement.getAttribute('title') : '',
-                            href: titleElement ? titleElement.getAttribute('href') : '',
-                            text: titleElement ? titleElement.textContent : ''
-                        };
-                    """, item)
-                    
-                    policy['文件名称'] = title_info['title'] or title_info['text']
-                    policy['来源'] = title_info['href']
-                    policy['本地文件名'] = "".join(char for char in policy['文件名称'] if char.isalnum() or char.isspace())
-                    
-                    # 获取其他信息
-                    other_info = driver.execute_script("""
-                        var item = arguments[0];
-                        return {
-                            docNumber: item.querySelector('.xzgfx_list_title3') ? item.querySelector('.xzgfx_list_title3').textContent : '',
-                            pubDate: item.querySelector('.xzgfx_list_title4') ? item.querySelector('.xzgfx_list_title4').textContent : '',
-                            effectDate: item.querySelector('.xzgfx_list_title5') ? item.querySelector('.xzgfx_list_title5').textContent : ''
-                        };
-                    """, item)
-                    
-                    policy['文号'] = other_info['docNumber']
-                    policy['成文日期'] = other_info['pubDate']
-                    policy['发布日期'] = other_info['effectDate']
+                    if is_known and policy['来源'] and is_known(policy['来源']):
+                        policy['已抓取'] = True
+                        page_policies.append(policy)
+                        continue
                     
                     # 获取详细页面信息
                     if policy['来源']:
-                        try:
-                            # 打开新标签页
-                            driver.execute_script(f"window.open('{policy['来源']}', '_blank');")
-                            time.sleep(2)
-                            
-                            # 切换到新标签页
-                            driver.switch_to.window(driver.window_handles[-1])
-                            
-                            # 等待详细信息加载
-                            wait = WebDriverWait(driver, 10)
-                            wait.until(EC.presence_of_element_located((By.CLASS_NAME, "xxgk")))
-                            
-                            # 获取主题分类
-                            theme = driver.execute_script("""
-                                var thElement = document.evaluate("//th[contains(text(), '主题分类')]", 
-                                    document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                                if (thElement) {
-                                    var tdElement = thElement.nextElementSibling;
-                                    return tdElement ? tdElement.textContent : '';
-                                }
-                                return '';
-                            """)
-                            
-                            policy['主题分类'] = theme.strip() if theme else ""
-                            
-                            # 关闭详细页面标签
-                            driver.close()
-                            
-                            # 切回主页面
-                            driver.switch_to.window(driver.window_handles[0])
-                            
-                        except Exception as e:
-                            print(f"获取详细信息失败: {e}")
-                            policy['主题分类'] = ""
-                            # 确保切回主页面
-                            if len(driver.window_handles) > 1:
-                                driver.close()
-                            driver.switch_to.window(driver.window_handles[0])
+                        detail = fetcher.policy_detail(policy['来源']) if fetcher is not None else None
+                        if detail is None:
+                            detail = get_policy_detail_in_tab(driver, policy['来源'])
+                        if detail is None:
+                            policy['抓取失败'] = True
+                        else:
+                            policy.update(detail)
+                    else:
+                        policy.update({'主题分类': "", '正文': ""})
                     
                     page_policies.append(policy)
+                    if policy.get('抓取失败'):
+                        continue
+                    if on_policy:
+                        on_policy(policy)
                     print(f"成功获取政策: {policy['文件名称']}")
                     
                 except Exception as e:
@@ -179,6 +190,431 @@ def get_policy_list(driver, page_url):
     
     return []
 
+def wait_for_list_page(driver, timeout=15):
+    """等待列表页渲染完成：分页控件出现，且列表项已渲染或页面确实为空"""
+    wait = WebDriverWait(driver, timeout)
+    wait.until(EC.presence_of_element_located((By.CLASS_NAME, "simple_pgContainer")))
+    try:
+        WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.CLASS_NAME, "xzgfx_list_item")))
+    except TimeoutException:
+        pass
+
+
+# 一次脚本调用取回列表页全部条目的所有字段，避免每条政策多次 WebDriver 往返
+LIST_ITEMS_SCRIPT = """
+    var text = function (item, selector) {
+        var element = item.querySelector(selector);
+        return element ? element.textContent : '';
+    };
+    return Array.prototype.map.call(document.getElementsByClassName('xzgfx_list_item'), function (item) {
+        var titleElement = item.querySelector('.xzgfx_list_title2 a');
+        return {
+            title: titleElement ? titleElement.getAttribute('title') : '',
+            href: titleElement ? titleElement.getAttribute('href') : '',
+            text: titleElement ? titleElement.textContent : '',
+            docNumber: text(item, '.xzgfx_list_title3'),
+            pubDate: text(item, '.xzgfx_list_title4'),
+            effectDate: text(item, '.xzgfx_list_title5')
+        };
+    });
+"""
+
+
+def extract_list_items(driver, page_url):
+    """读取当前列表页的全部政策条目（不含详情页信息）"""
+    policies = []
+    for info in driver.execute_script(LIST_ITEMS_SCRIPT) or []:
+        try:
+            policies.append(make_policy(page_url, info, info))
+        except Exception as e:
+            print(f"处理单条政策时出错: {e}")
+    return policies
+
+
+def make_policy(page_url, title_info, other_info):
+    policy = {}
+    policy['文件名称'] = title_info['title'] or title_info['text']
+    policy['来源'] = urljoin(page_url, title_info['href']) if title_info['href'] else ''
+    policy['本地文件名'] = "".join(char for char in policy['文件名称'] if char.isalnum() or char.isspace())
+    policy['文号'] = other_info['docNumber']
+    policy['成文日期'] = other_info['pubDate']
+    policy['发布日期'] = other_info['effectDate']
+    return policy
+
+
+# ==================== 无浏览器抓取 ====================
+def _class_xpath(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# 正文容器候选，按顺序取第一个命中的元素
+DETAIL_BODY_CANDIDATES = [
+    "//*[@id='zoom']",
+    f"//*[{_class_xpath('article-conter')}]",
+    f"//*[{_class_xpath('article')}]",
+]
+
+
+if etree is not None:
+    LIST_ITEM_XPATH = etree.XPath(f"//*[{_class_xpath('xzgfx_list_item')}]")
+    LIST_TITLE_XPATH = etree.XPath(f".//*[{_class_xpath('xzgfx_list_title2')}]//a[1]")
+    LIST_FIELD_XPATHS = {
+        field: etree.XPath(f"string(.//*[{_class_xpath(name)}][1])")
+        for field, name in (('docNumber', 'xzgfx_list_title3'), ('pubDate', 'xzgfx_list_title4'),
+                            ('effectDate', 'xzgfx_list_title5'))
+    }
+    DETAIL_TABLE_XPATH = etree.XPath(f"//*[{_class_xpath('xxgk')}]")
+    DETAIL_THEME_XPATH = etree.XPath("string(//th[contains(text(), '主题分类')]/following-sibling::td[1])")
+    DETAIL_BODY_XPATHS = [etree.XPath(xpath) for xpath in DETAIL_BODY_CANDIDATES]
+
+
+def parse_list_html(html, page_url):
+    """用预编译的 XPath 从列表页 HTML 中解析政策条目；列表由脚本渲染时返回空列表"""
+    document = lxml_html.fromstring(html)
+    policies = []
+    for item in LIST_ITEM_XPATH(document):
+        titles = LIST_TITLE_XPATH(item)
+        title = titles[0] if titles else None
+        info = {
+            'title': title.get('title', '') if title is not None else '',
+            'href': title.get('href', '') if title is not None else '',
+            'text': title.text_content() if title is not None else '',
+        }
+        info.update({field: str(xpath(item)) for field, xpath in LIST_FIELD_XPATHS.items()})
+        policies.append(make_policy(page_url, info, info))
+    return policies
+
+
+def parse_detail_html(html):
+    """解析详情页；页面中没有 xxgk 信息表时返回 None"""
+    document = lxml_html.fromstring(html)
+    if not DETAIL_TABLE_XPATH(document):
+        return None
+    body = next((found[0] for found in (xpath(document) for xpath in DETAIL_BODY_XPATHS) if found), None)
+    return {'主题分类': str(DETAIL_THEME_XPATH(document)).strip(),
+            '正文': body.text_content().strip() if body is not None else ""}
+
+
+class HttpFetcher:
+    """直接请求页面 HTML 的轻量抓取器，按主机限速"""
+    
+    def __init__(self, limiter=None, timeout=15, user_agent='Mozilla/5.0 (compatible; sentence_cat crawler)'):
+        self.limiter = limiter
+        self.timeout = timeout
+        self.headers = {'User-Agent': user_agent}
+    
+    @staticmethod
+    def available():
+        return lxml_html is not None
+    
+    def fetch(self, url):
+        if self.limiter is not None:
+            self.limiter.wait(url)
+        with urlopen(Request(url, headers=self.headers), timeout=self.timeout) as response:
+            charset = response.headers.get_content_charset() or 'utf-8'
+            return response.read().decode(charset, errors='replace')
+    
+    def policy_list(self, page_url):
+        try:
+            return parse_list_html(self.fetch(page_url), page_url)
+        except Exception as e:
+            print(f"HTTP 获取列表页失败，改用浏览器: {e}")
+            return []
+    
+    def policy_detail(self, url):
+        try:
+            return parse_detail_html(self.fetch(url))
+        except Exception as e:
+            print(f"HTTP 获取详情页失败，改用浏览器: {e}")
+            return None
+
+
+def create_driver(headless=True):
+    """创建 Chrome 驱动"""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(30)
+    return driver
+
+
+class RateLimiter:
+    """按主机限制请求间隔（线程安全），代替固定的 time.sleep"""
+    
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+    
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def crawl_concurrent(page_numbers, base_url_template=BASE_URL_TEMPLATE, workers=4, min_interval=1.0,
+                     max_retries=3, driver_factory=create_driver, store=None, http_first=True, on_policy=None):
+    """并发抓取：每个工作线程按需持有一个无头浏览器，列表页与详情页任务共用一个工作队列
+    
+    http_first 时先直接请求 HTML 并用 XPath 解析，只有页面需要脚本渲染时才启动浏览器。
+    传入 store（CheckpointStore）时跳过已完成的页码与已抓取的政策，每条政策抓到即写入，
+    一页的详情全部成功后才记为已完成。详情页失败会重新入队，重试 max_retries 次仍失败的政策不写入 store，
+    其页码也不记为已完成，下次运行时重试。同一来源出现在多个列表页时（翻页中途列表有变动）只抓取一次。
+    on_policy 在每条新政策抓取完成时于工作线程中回调，每个来源至多一次；store 中已有的政策不回调。
+    返回 (按页码排序的政策列表, 最终失败的页码列表：列表页失败或有详情页失败)
+    """
+    tasks = queue.Queue()
+    limiter = RateLimiter(min_interval)
+    fetcher = HttpFetcher(limiter) if http_first and HttpFetcher.available() else None
+    lock = threading.Lock()
+    pages = {}
+    remaining = {}
+    failed_pages = []
+    incomplete_pages = set()
+    claimed = set()  # 本次运行中已入队或已完成的来源
+    done_pages = store.done_pages() if store is not None else set()
+    
+    for page in page_numbers:
+        if page not in done_pages:
+            tasks.put(("list", page, None, 1))
+    
+    def finish_item(page, policy=None, failed=False):
+        # 每页的计数 = 条目数 + 1（列表本身），全部成功后才把页码记为已完成
+        is_new = policy is not None
+        if store is not None and policy is not None:
+            is_new = store.add_policy(policy, page)
+        if on_policy is not None and is_new:
+            on_policy(policy)
+        with lock:
+            if failed:
+                incomplete_pages.add(page)
+            remaining[page] -= 1
+            page_done = remaining[page] == 0 and page not in incomplete_pages
+        if page_done and store is not None:
+            store.mark_page_done(page, len(pages[page]))
+    
+    def handle(get_driver, task):
+        kind, page, policy, attempt = task
+        if kind == "list":
+            page_url = base_url_template.format(page)
+            try:
+                policies = fetcher.policy_list(page_url) if fetcher is not None else []
+                if not policies:
+                    driver = get_driver()
+                    limiter.wait(page_url)
+                    driver.get(page_url)
+                    wait_for_list_page(driver)
+                    policies = extract_list_items(driver, page_url)
+                if not policies:
+                    raise ValueError("列表为空")
+            except Exception as e:
+                print(f"获取第 {page} 页失败 (尝试 {attempt}/{max_retries}): {e}")
+                if attempt < max_retries:
+                    tasks.put(("list", page, None, attempt + 1))
+                else:
+                    with lock:
+                        failed_pages.append(page)
+                return
+            
+            print(f"第 {page} 页找到 {len(policies)} 条政策")
+            with lock:
+                pages[page] = policies
+                remaining[page] = len(policies) + 1
+            for item in policies:
+                with lock:
+                    duplicate = item['来源'] in claimed
+                    claimed.add(item['来源'])
+                if item['来源'] and duplicate:
+                    # 已在其他列表页中出现，由那一条负责抓取
+                    item['重复'] = True
+                    finish_item(page)
+                elif store is not None and item['来源'] and store.is_known(item['来源']):
+                    item['已抓取'] = True
+                    finish_item(page)
+                elif item['来源']:
+                    tasks.put(("detail", page, item, 1))
+                else:
+                    item.update({'主题分类': "", '正文': ""})
+                    finish_item(page, item)
+            finish_item(page)
+        else:
+            try:
+                detail = fetcher.policy_detail(policy['来源']) if fetcher is not None else None
+                if detail is None:
+                    limiter.wait(policy['来源'])
+                    detail = get_policy_detail(get_driver(), policy['来源'])
+                if detail is None:
+                    raise ValueError("详情页加载失败")
+            except Exception as e:
+                print(f"获取政策详情失败 {policy['来源']} (尝试 {attempt}/{max_retries}): {e}")
+                if attempt < max_retries:
+                    tasks.put(("detail", page, policy, attempt + 1))
+                else:
+                    policy['抓取失败'] = True
+                    finish_item(page, failed=True)
+                return
+            policy.update(detail)
+            print(f"成功获取政策: {policy['文件名称']}")
+            finish_item(page, policy)
+    
+    def worker():
+        drivers = []
+        
+        def get_driver():
+            # 浏览器只在 HTTP 解析不到内容时才启动
+            if not drivers:
+                drivers.append(driver_factory())
+            return drivers[0]
+        
+        try:
+            while True:
+                task = tasks.get()
+                if task is None:
+                    tasks.task_done()
+                    break
+                try:
+                    handle(get_driver, task)
+                except Exception as e:
+                    print(f"处理任务 {task[:2]} 时出错: {e}")
+                finally:
+                    tasks.task_done()
+        finally:
+            for driver in drivers:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+    
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    tasks.join()
+    for _ in threads:
+        tasks.put(None)
+    for thread in threads:
+        thread.join()
+    
+    all_policies = [policy for page in sorted(pages) for policy in pages[page]
+                    if not policy.get('抓取失败') and not policy.get('重复')]
+    return all_policies, sorted(set(failed_pages) | incomplete_pages)
+
+
+class CheckpointStore:
+    """基于 SQLite 的追加式断点存储：每条政策抓到即写入，按来源 URL 去重，并记录已完成的页码
+
+    analyzed_at 记录政策正文的句子分类结果已写出的时间（pipeline.py 使用），为空表示尚未分析。
+    """
+    
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS policies (
+                source TEXT PRIMARY KEY,
+                page INTEGER,
+                seq INTEGER,
+                data TEXT NOT NULL,
+                fetched_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_policies_seq ON policies (seq);
+            CREATE TABLE IF NOT EXISTS pages (
+                page INTEGER PRIMARY KEY,
+                items INTEGER,
+                finished_at REAL
+            );
+        """)
+        # 旧版断点文件没有 analyzed_at 列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(policies)")}
+        if 'analyzed_at' not in columns:
+            self._conn.execute("ALTER TABLE policies ADD COLUMN analyzed_at REAL")
+        self._conn.commit()
+    
+    def close(self):
+        self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    @staticmethod
+    def policy_key(policy):
+        return policy.get('来源') or f"title:{policy.get('文件名称', '')}"
+    
+    def add_policy(self, policy, page=None):
+        """写入一条政策，已存在（同一来源）时忽略；返回是否为新政策"""
+        data = {k: v for k, v in policy.items() if k != '已抓取'}
+        with self._lock:
+            seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM policies").fetchone()[0]
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO policies (source, page, seq, data, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (self.policy_key(policy), page, seq, json.dumps(data, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+    
+    def policy_seq(self, policy):
+        """政策的写入序号（跨运行唯一且递增）；不在存储中时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM policies WHERE source = ?", (self.policy_key(policy),)).fetchone()
+        return row[0] if row else None
+    
+    def mark_analyzed(self, policies):
+        if not policies:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("UPDATE policies SET analyzed_at = ? WHERE source = ?",
+                                   [(now, self.policy_key(policy)) for policy in policies])
+            self._conn.commit()
+    
+    def unanalyzed_policies(self):
+        """已抓取但分类结果尚未写出的政策，返回 [(序号, 政策), ...]"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, data FROM policies WHERE analyzed_at IS NULL ORDER BY seq"
+            ).fetchall()
+        return [(seq, json.loads(data)) for seq, data in rows]
+    
+    def is_known(self, source):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM policies WHERE source = ?", (source,)).fetchone() is not None
+    
+    def mark_page_done(self, page, items):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO pages (page, items, finished_at) VALUES (?, ?, ?)",
+                               (page, items, time.time()))
+            self._conn.commit()
+    
+    def done_pages(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT page FROM pages")}
+    
+    def first_incomplete_page(self, total_pages):
+        done = self.done_pages()
+        return next((page for page in range(1, total_pages + 1) if page not in done), None)
+    
+    def policies(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM policies ORDER BY seq").fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM policies").fetchone()[0]
+
+
 def save_to_csv(policies, output_file):
     """将政策信息保存到CSV文件"""
     try:
@@ -208,59 +644,129 @@ def save_to_csv(policies, output_file):
     except Exception as e:
         print(f"保存CSV文件失败: {e}")
 
-def main():
-    base_url_template = 'https://www.zj.gov.cn/col/col1229697834/index.html?number=C0103&pageNum={}'
-    total_pages = 136
-    all_policies = []
-    current_page = 1
+def get_policy_list_http(fetcher, page_url, get_driver, on_policy=None, is_known=None):
+    """无浏览器获取单页政策列表：列表与详情都直接请求 HTML，详情页解析失败时才用浏览器"""
+    page_policies = fetcher.policy_list(page_url)
+    for policy in page_policies:
+        if is_known and policy['来源'] and is_known(policy['来源']):
+            policy['已抓取'] = True
+            continue
+        if policy['来源']:
+            detail = fetcher.policy_detail(policy['来源'])
+            if detail is None:
+                detail = get_policy_detail(get_driver(), policy['来源'])
+            if detail is None:
+                policy['抓取失败'] = True
+                continue
+            policy.update(detail)
+        else:
+            policy.update({'主题分类': "", '正文': ""})
+        if on_policy:
+            on_policy(policy)
+        print(f"成功获取政策: {policy['文件名称']}")
+    return page_policies
+
+
+def crawl_sequential(base_url_template, total_pages, store, min_interval=3.0, incremental=False, http_first=True):
+    """顺序抓取，每条政策抓到即写入 store
+    
+    http_first 时优先直接请求 HTML，列表由脚本渲染时再用浏览器（浏览器按需启动）。
+    普通模式从第一个未完成的页码继续；incremental 模式从第 1 页开始，
+    遇到整页都已抓取过的页面即停止（新政策总是出现在列表前部）。
+    """
+    limiter = RateLimiter(min_interval)
+    fetcher = HttpFetcher(limiter) if http_first and HttpFetcher.available() else None
+    drivers = []
+    
+    def get_driver():
+        if not drivers:
+            drivers.append(create_driver(headless=False))
+        return drivers[0]
+    
+    if incremental:
+        current_page = 1
+    else:
+        current_page = store.first_incomplete_page(total_pages)
+        if current_page is None:
+            print("所有页面均已完成")
+            return
+        if current_page > 1:
+            print(f"从第 {current_page} 页继续抓取，已保存 {len(store)} 条政策")
     
     try:
-        # 初始化Chrome驱动
-        options = webdriver.ChromeOptions()
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        driver = webdriver.Chrome(options=options)
-        driver.set_page_load_timeout(30)
-        
         while current_page <= total_pages:
             print(f"\n正在获取第 {current_page} 页...")
             page_url = base_url_template.format(current_page)
             
-            # 获取当前页的政策列表
-            page_policies = get_policy_list(driver, page_url)
+            # 获取当前页的政策列表（按主机限速代替页面间的固定等待）
+            on_policy = lambda policy: store.add_policy(policy, current_page)
+            page_policies = []
+            if fetcher is not None:
+                page_policies = get_policy_list_http(fetcher, page_url, get_driver, on_policy, store.is_known)
+            if not page_policies:
+                limiter.wait(page_url)
+                page_policies = get_policy_list(get_driver(), page_url, on_policy=on_policy, is_known=store.is_known,
+                                                fetcher=fetcher)
             
             if page_policies:
-                all_policies.extend(page_policies)
-                print(f"第 {current_page} 页获取完成，当前共获取 {len(all_policies)} 条政策")
+                new_count = sum(1 for policy in page_policies if not policy.get('已抓取') and not policy.get('抓取失败'))
+                failed_count = sum(1 for policy in page_policies if policy.get('抓取失败'))
+                # 有详情获取失败的页面不记为已完成，下次运行时重新抓取失败的条目
+                if failed_count:
+                    print(f"第 {current_page} 页有 {failed_count} 条政策详情获取失败，下次运行时重试")
+                else:
+                    store.mark_page_done(current_page, len(page_policies))
+                print(f"第 {current_page} 页获取完成，新增 {new_count} 条，当前共保存 {len(store)} 条政策")
                 
-                # 每获取5页保存一次
-                if current_page % 5 == 0:
-                    save_to_csv(all_policies, f'zjpolices_temp_{current_page}.csv')
-                    print(f"已完成 {current_page} 页的数据获取，临时保存完成")
+                if incremental and new_count == 0:
+                    print("本页政策均已抓取过，增量更新结束")
+                    break
                 
                 current_page += 1
             else:
                 print(f"第 {current_page} 页获取失败，重试...")
-                time.sleep(5)  # 失败后等待更长时间
                 continue
             
-            time.sleep(3)  # 页面间隔
-            
     except Exception as e:
         print(f"获取过程中出错: {e}")
     
     finally:
-        try:
-            driver.quit()
-        except:
-            pass
-        
-        if all_policies:
-            save_to_csv(all_policies, 'zjpolices_final.csv')
-            print(f"\n总共获取到 {len(all_policies)} 条政策信息")
+        for driver in drivers:
+            try:
+                driver.quit()
+            except:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取浙江省政府规范性文件列表")
+    parser.add_argument('--base-url', default=BASE_URL_TEMPLATE, help="列表页 URL 模板，{} 处填页码")
+    parser.add_argument('--pages', type=int, default=TOTAL_PAGES)
+    parser.add_argument('--workers', type=int, default=1, help="大于 1 时使用多个无头浏览器并发抓取")
+    parser.add_argument('--min-interval', type=float, default=1.0, help="同一主机两次请求的最小间隔（秒）")
+    parser.add_argument('--output', default='zjpolices_final.csv')
+    parser.add_argument('--checkpoint', default='zjpolices_checkpoint.sqlite', help="断点存储文件，重新运行时从中断处继续")
+    parser.add_argument('--incremental', action='store_true', help="增量模式：从第 1 页抓到已抓取过的政策为止（顺序抓取）")
+    parser.add_argument('--no-http', action='store_true', help="不尝试直接请求 HTML，全部使用浏览器")
+    args = parser.parse_args()
+    
+    with CheckpointStore(args.checkpoint) as store:
+        if args.workers > 1 and not args.incremental:
+            _, failed_pages = crawl_concurrent(range(1, args.pages + 1), args.base_url, workers=args.workers,
+                                               min_interval=args.min_interval, store=store,
+                                               http_first=not args.no_http)
+            if failed_pages:
+                print(f"以下页面抓取失败: {failed_pages}")
         else:
-            print("未获取到任何政策信息")
+            crawl_sequential(args.base_url, args.pages, store, min_interval=args.min_interval,
+                             incremental=args.incremental, http_first=not args.no_http)
+        all_policies = store.policies()
+    
+    if all_policies:
+        save_to_csv(all_policies, args.output)
+        print(f"\n总共获取到 {len(all_policies)} 条政策信息")
+    else:
+        print("未获取到任何政策信息")
 
 if __name__ == "__main__":
     main() 